@@ -1 +1,3 @@
 """Path finding project."""
+
+from path.config import configure
@@ -1,15 +1,98 @@
 """Main module."""
 
+import argparse
+import cProfile
+import pstats
+import time
+
+import numpy as np
+
 from tensorforce import Environment as Env
 from tensorforce import Agent, Runner
 
-import path.const as const
-from path.environment import Environment, get_ground_truth
+from path.dataset import ExperienceBatcher, expert_episodes
+from path.environment import Environment
+from path.workers import EnvironmentPool
+
+MAX_EPISODE_TIMESTEPS = 100
+
+
+def bootstrap(agent, args: argparse.Namespace):
+    """Feed ground truth experiences to the agent in batches of episodes.
+
+    Args:
+        agent: The tensorforce agent.
+        args (argparse.Namespace): The parsed command line arguments.
+    """
+    episodes = expert_episodes(
+        args.episodes, seed=args.seed, starts_per_layout=args.starts,
+    )
+    batcher = ExperienceBatcher()
+    batches = batcher.batches(episodes, args.episodes_per_update)
+    for batch_idx, batch in enumerate(batches):
+        print('Bootstrapping batch {0} ({1} steps)'.format(
+            batch_idx, len(batch['actions']),
+        ))
+        agent.experience(**batch)
+        agent.update()
 
 
-def main():
+def evaluate_parallel(agent, workers: int, episodes: int, seed: int) -> tuple:
+    """Evaluate the agent on environments stepped by worker processes.
+
+    The agent acts on the states of all environments in one batched call
+    per step. Each environment runs a fixed quota of the episodes, so long
+    episodes are counted like short ones.
+
+    Args:
+        agent: The tensorforce agent, with at least workers parallel
+            interactions.
+        workers (int): The number of worker processes.
+        episodes (int): The number of episodes to evaluate.
+        seed (int): The seed of the environments.
+
+    Returns:
+        list: The number of steps of each episode.
+        list: The return of each episode.
+        int: The number of steps of all environments, including those
+            stepped after reaching their quota.
+    """
+    quotas = np.diff(np.linspace(0, episodes, workers + 1).astype(int))
+    parallel = list(range(workers))
+    episode_steps = np.zeros(workers, dtype=np.int64)
+    episode_returns = np.zeros(workers, dtype=np.float64)
+    steps, rewards = [], []
+    pool = EnvironmentPool(
+        workers, seed=seed, max_episode_steps=MAX_EPISODE_TIMESTEPS,
+    )
+    try:
+        states = pool.reset()
+        while len(steps) < episodes:
+            actions = agent.act(
+                states=states,
+                parallel=parallel,
+                independent=True,
+                deterministic=True,
+            )
+            states, reward, done, info = pool.step(actions)
+            episode_steps += 1
+            episode_returns += reward
+            for idx in np.flatnonzero(done | info['truncated']).tolist():
+                if quotas[idx] > 0:
+                    quotas[idx] -= 1
+                    steps.append(int(episode_steps[idx]))
+                    rewards.append(float(episode_returns[idx]))
+                episode_steps[idx] = 0
+                episode_returns[idx] = 0
+    finally:
+        pool.close()
+    return steps, rewards, pool.steps
+
+
+def main(args: argparse.Namespace):
     environment = Env.create(
-        environment=Environment, max_episode_timesteps=100,
+        environment=Environment,
+        max_episode_timesteps=MAX_EPISODE_TIMESTEPS,
     )
 
     # Instantiate a Tensorforce agent
@@ -17,49 +100,31 @@ def main():
         agent='configs/dqn.json',
         # alternatively: states, actions, (max_episode_timesteps)
         environment=environment,
+        parallel_interactions=args.workers,
     )
 
-    # bootstrap agent
-    # get ground truth experiences
-    for boot_ep in range(500):
-        print('Bootstrapping episode {}'.format(boot_ep))
-        env = Environment()
-        env.reset()
-        episode_states = list()
-        episode_actions = list()
-        episode_terminal = list()
-        episode_reward = list()
-
-        # transform experiences to lists of attributes
-        experiences = env.ground_truth
-        for experience in experiences:
-            episode_states.append(experience['state'])
-            episode_actions.append(experience['action'])
-            episode_terminal.append(experience['done'])
-            episode_reward.append(experience['reward'])
-
-        # apply experience
-        agent.experience(
-            states=episode_states,
-            actions=episode_actions,
-            terminal=episode_terminal,
-            reward=episode_reward,
-        )
-
-        # perform update
-        agent.update()
+    # bootstrap agent with ground truth experiences
+    bootstrap(agent, args)
 
     # run agent
     runner = Runner(
         agent=agent,
         environment=environment,
     )
-    runner.run(num_episodes=100, evaluation=True)
+    start = time.perf_counter()
+    if args.workers > 1:
+        steps, rewards, total_steps = evaluate_parallel(
+            agent, args.workers, args.eval_episodes, args.seed,
+        )
+    else:
+        runner.run(num_episodes=args.eval_episodes, evaluation=True)
+        steps = runner.evaluation_timesteps
+        rewards = runner.evaluation_returns
+        total_steps = sum(steps)
+    elapsed = time.perf_counter() - start
 
     # evaluation
-    steps = runner.evaluation_timesteps
-    rewards = runner.evaluation_returns
-
+    print('Steps per second: {}'.format(total_steps / elapsed))
     print('Average steps taken: {}'.format(sum(steps) / len(steps)))
     print('Average reward: {}'.format(sum(rewards) / len(rewards)))
 
@@ -73,5 +138,85 @@ def main():
     runner.close()
 
 
+def run_profiled(args: argparse.Namespace):
+    """Run main under cProfile, save the stats and print the top entries.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+    """
+    profiler = cProfile.Profile()
+    profiler.runcall(main, args)
+    profiler.dump_stats(args.profile)
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(
+        args.profile_top,
+    )
+
+
+def parse_args(argv: list | None = None) -> argparse.Namespace:
+    """Parse the command line arguments.
+
+    Args:
+        argv (list | None): The arguments, sys.argv if None.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description='Bootstrap and train a DQN agent on the environment.',
+    )
+    parser.add_argument(
+        '--episodes',
+        type=int,
+        default=500,
+        help='number of ground truth episodes to bootstrap with',
+    )
+    parser.add_argument(
+        '--episodes-per-update',
+        type=int,
+        default=1,
+        help='number of episodes per experience and update call',
+    )
+    parser.add_argument(
+        '--starts',
+        type=int,
+        default=1,
+        help='number of bootstrap episodes solved per layout',
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='seed of the bootstrap episodes',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='number of environment worker processes for evaluation',
+    )
+    parser.add_argument(
+        '--eval-episodes',
+        type=int,
+        default=100,
+        help='number of evaluation episodes',
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='profile the run with cProfile and dump the stats to FILE',
+    )
+    parser.add_argument(
+        '--profile-top',
+        type=int,
+        default=30,
+        help='number of profile entries to print',
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.profile is None:
+        main(args)
+    else:
+        run_profiled(args)
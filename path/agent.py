@@ -7,6 +7,8 @@ from path.elements import Element
 class Agent(Element):
     """Agent class."""
 
+    __slots__ = ()
+
     def __init__(self):
         """Initialize the agent."""
         super().__init__(movable=True)
@@ -26,3 +28,11 @@ class Agent(Element):
             float: The agent as a float.
         """
         return const.AGENT_FLOAT
+
+    def to_code(self):
+        """Return the agent as a uint8 observation code.
+
+        Returns:
+            int: The agent as a code.
+        """
+        return const.AGENT_CODE
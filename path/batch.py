@@ -0,0 +1,179 @@
+"""Vectorized environment stepping many grids at once."""
+
+import gym
+import numpy as np
+
+from path import const
+
+ACTION_DELTAS = np.array(const.ACTION_DELTAS, dtype=np.int64)
+
+
+class BatchEnvironment(gym.Env):
+    """N independent pathfinding grids stepped with numpy indexing.
+
+    The grids are stored as stacked layers of shape (N, rows, cols), and the
+    agents as two position vectors of shape (N,). Each member follows the
+    rules of Environment: a bordered grid with the goal in the bottom right
+    corner and a random agent start. Members that reach their goal are
+    reset in place at the end of step().
+    """
+
+    def __init__(
+        self,
+        n_envs: int,
+        size: tuple = (8, 8),
+        copy_observation: bool = False,
+        seed: int | None = None,
+    ):
+        """Initialize the batch environment.
+
+        As in Environment, step() and reset() return a read-only view of the
+        observation buffer unless copy_observation is set.
+
+        Args:
+            n_envs (int): The number of grids.
+            size (tuple): The size of each grid.
+            copy_observation (bool): Whether to return a copy of the buffer.
+            seed (int | None): The seed of the random agent starts.
+        """
+        self.n_envs = n_envs
+        self.rows = size[0]
+        self.cols = size[1]
+        self.copy_observation = copy_observation
+        self.rng = np.random.default_rng(seed)
+
+        self.action_space = gym.spaces.MultiDiscrete([4] * n_envs)
+        self.observation_space = gym.spaces.Box(
+            low=0,
+            high=1,
+            shape=(n_envs, self.rows, self.cols),
+            dtype=np.float32,
+        )
+        self.reward_range = (-10, 10)
+
+        shape = (n_envs, self.rows, self.cols)
+        self.obstacle = np.zeros(shape, dtype=bool)
+        self.goal = np.zeros(shape, dtype=bool)
+        self.agent_rows = np.zeros(n_envs, dtype=np.int64)
+        self.agent_cols = np.zeros(n_envs, dtype=np.int64)
+        # observation without the agents, and with them
+        self._base = np.zeros(shape, dtype=np.float32)
+        self._observation = np.zeros(shape, dtype=np.float32)
+        self._members = np.arange(n_envs)
+
+    def step(self, actions: np.ndarray) -> tuple:
+        """Perform one action in every grid.
+
+        Args:
+            actions (np.ndarray): The action of each grid, of shape (N,).
+
+        Returns:
+            ndarray: The next states, of shape (N, rows, cols).
+            ndarray: The rewards, of shape (N,).
+            ndarray: The done flags, of shape (N,).
+            dict: Additional information. 'terminal_observation' holds the
+                last observation of the members that were reset.
+
+        Raises:
+            ValueError: If an action is invalid.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if actions.shape != (self.n_envs,):
+            raise ValueError('Expected {} actions'.format(self.n_envs))
+        if np.any((actions < 0) | (actions > 3)):
+            raise ValueError('Invalid action {}'.format(actions))
+
+        members = self._members
+        dest_rows = self.agent_rows + ACTION_DELTAS[actions, 0]
+        dest_cols = self.agent_cols + ACTION_DELTAS[actions, 1]
+        moved = ~self.obstacle[members, dest_rows, dest_cols]
+        dest_rows = np.where(moved, dest_rows, self.agent_rows)
+        dest_cols = np.where(moved, dest_cols, self.agent_cols)
+        self._place_agents(members, dest_rows, dest_cols)
+
+        done = self.goal[members, dest_rows, dest_cols]
+        reward = np.where(moved, -1, -10).astype(np.float32)
+
+        info = {}
+        if done.any():
+            finished = np.flatnonzero(done)
+            info['terminal_observation'] = self._observation[finished].copy()
+            self._reset_members(finished)
+        return self.observe(), reward, done, info
+
+    def reset(self) -> np.ndarray:
+        """Reset every grid.
+
+        Returns:
+            ndarray: The states, of shape (N, rows, cols).
+        """
+        self._reset_members(self._members)
+        return self.observe()
+
+    def observe(self) -> np.ndarray:
+        """Return the current observations of the grids.
+
+        Returns:
+            ndarray: The observations, see __init__ for the aliasing
+                contract.
+        """
+        if self.copy_observation:
+            return self._observation.copy()
+        view = self._observation.view()
+        view.flags.writeable = False
+        return view
+
+    def render(self):
+        """Render the first grid of the batch."""
+        print(self._observation[0])
+
+    def _reset_members(self, members: np.ndarray):
+        """Generate a new layout and agent start for some members.
+
+        Args:
+            members (np.ndarray): The indices of the members to reset.
+        """
+        self.obstacle[members] = False
+        self.obstacle[members, 0, :] = True
+        self.obstacle[members, -1, :] = True
+        self.obstacle[members, :, 0] = True
+        self.obstacle[members, :, -1] = True
+        self.goal[members] = False
+        self.goal[members, self.rows - 2, self.cols - 2] = True
+
+        self._base[members] = (
+            self.obstacle[members] * const.OBSTACLE_FLOAT
+            + self.goal[members] * const.GOAL_FLOAT
+        )
+
+        # random agent start on a free cell of each member
+        free = ~(self.obstacle[members] | self.goal[members])
+        scores = self.rng.random(free.shape)
+        scores[~free] = -1
+        starts = scores.reshape(len(members), -1).argmax(axis=1)
+        self._observation[members] = self._base[members]
+        self.agent_rows[members] = -1
+        self._place_agents(members, *np.divmod(starts, self.cols))
+
+    def _place_agents(
+        self, members: np.ndarray, rows: np.ndarray, cols: np.ndarray,
+    ):
+        """Move the agents of some members and update their observations.
+
+        Args:
+            members (np.ndarray): The indices of the members.
+            rows (np.ndarray): The new agent rows.
+            cols (np.ndarray): The new agent cols.
+        """
+        placed = self.agent_rows[members] >= 0
+        old = members[placed]
+        self._observation[
+            old, self.agent_rows[old], self.agent_cols[old],
+        ] = self._base[old, self.agent_rows[old], self.agent_cols[old]]
+
+        self.agent_rows[members] = rows
+        self.agent_cols[members] = cols
+        self._observation[members, rows, cols] = (
+            self._base[members, rows, cols].astype(np.float64)
+            + const.AGENT_FLOAT
+        )
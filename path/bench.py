@@ -0,0 +1,192 @@
+"""Benchmark environment throughput over grid sizes and obstacle densities.
+
+Run with ``python -m path.bench``. Results are printed as JSON, so runs
+from different commits can be compared. Pass ``--no-checks`` to benchmark
+without the runtime type checks.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from path import config
+
+DEFAULT_SIZES = (8, 16, 32, 64, 128, 256, 512)
+DEFAULT_DENSITIES = (0.0, 0.1, 0.3)
+DEFAULT_SOLVERS = ('field', 'scipy', 'astar')
+
+
+def percentiles(samples: list) -> dict:
+    """Return latency percentiles in milliseconds.
+
+    Args:
+        samples (list): The latencies in seconds.
+
+    Returns:
+        dict: The p50, p90 and p99 latencies.
+    """
+    p50, p90, p99 = np.percentile(np.array(samples) * 1000, (50, 90, 99))
+    return {'p50': p50, 'p90': p90, 'p99': p99}
+
+
+def peak_memory(func) -> float:
+    """Return the peak memory allocated while running a function.
+
+    Args:
+        func: The function, called without arguments.
+
+    Returns:
+        float: The peak memory in MiB.
+    """
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def bench_case(
+    size: int,
+    density: float,
+    steps: int,
+    resets: int,
+    solvers: tuple,
+) -> dict:
+    """Benchmark the environment for one grid size and obstacle density.
+
+    Args:
+        size (int): The number of rows and cols of the grid.
+        density (float): The fraction of interior cells with obstacles.
+        steps (int): The number of steps to time.
+        resets (int): The number of resets and ground truth solves to time.
+        solvers (tuple): The ground truth solvers to time.
+
+    Returns:
+        dict: The results of the case.
+    """
+    # imported here so that the configuration of main() applies
+    from path.environment import Environment, get_ground_truth
+    from path.ground_truth import adjacency_matrix
+
+    obstacles = int(density * (size - 2) ** 2)
+    env = Environment((size, size), obstacles=obstacles, seed=0)
+
+    start = time.perf_counter()
+    for _ in range(resets):
+        env.reset()
+    resets_per_sec = resets / (time.perf_counter() - start)
+
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, 4, steps).tolist()
+    start = time.perf_counter()
+    for action in actions:
+        _, _, done, _ = env.step(action)
+        if done:
+            env.reset()
+    steps_per_sec = steps / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(resets):
+        env.gr.as_float()
+    as_float = (time.perf_counter() - start) / resets
+
+    start = time.perf_counter()
+    for _ in range(resets):
+        adjacency_matrix(env.gr)
+    adjacency = (time.perf_counter() - start) / resets
+
+    latencies = {solver: [] for solver in solvers}
+    for _ in range(resets):
+        env.reset()
+        for solver in solvers:
+            # drop the cached distance field to time a cold solve
+            env.invalidate_field()
+            start = time.perf_counter()
+            get_ground_truth(env, render=False, solver=solver)
+            latencies[solver].append(time.perf_counter() - start)
+
+    return {
+        'size': size,
+        'density': density,
+        'steps_per_sec': steps_per_sec,
+        'resets_per_sec': resets_per_sec,
+        'as_float_us': as_float * 1e6,
+        'adjacency_matrix_ms': adjacency * 1000,
+        'ground_truth_ms': {
+            solver: percentiles(samples)
+            for solver, samples in latencies.items()
+        },
+        'peak_memory_mib': {
+            'init': peak_memory(
+                lambda: Environment(
+                    (size, size), obstacles=obstacles, seed=0,
+                ).reset(),
+            ),
+            'reset': peak_memory(env.reset),
+        },
+    }
+
+
+def main(argv: list | None = None):
+    """Run the benchmark sweep and print the results as JSON.
+
+    Args:
+        argv (list | None): The command line arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+    )
+    parser.add_argument(
+        '--densities', type=float, nargs='+', default=DEFAULT_DENSITIES,
+    )
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--resets', type=int, default=20)
+    parser.add_argument(
+        '--solvers', nargs='+', default=DEFAULT_SOLVERS,
+    )
+    parser.add_argument('--output', help='file to write, stdout if unset')
+    parser.add_argument(
+        '--no-checks', dest='checks', action='store_false',
+        help='disable the runtime type checks',
+    )
+    args = parser.parse_args(argv)
+    config.configure(checks=args.checks)
+
+    results = []
+    for size in args.sizes:
+        for density in args.densities:
+            print(
+                'size {0} density {1}'.format(size, density),
+                file=sys.stderr,
+            )
+            results.append(bench_case(
+                size, density, args.steps, args.resets, tuple(args.solvers),
+            ))
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'checks': config.checks_enabled(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, default=float)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,24 @@
 """Grid cell module."""
 
-from beartype import beartype
-
 from path import const
+from path.config import checked
 
 HIGH_COST = 9999
 
+# aggregates of a cell: movable, move cost, goal, float and code, shared by
+# every empty cell
+_EMPTY = (True, const.DEFAULT_COST, False, 0.0, 0)
+
 
 class Cell(object):
-    """Cell holds the elements that are in the same location in the grid."""
+    """Cell holds the elements that are in the same location in the grid.
+
+    The movable, cost, goal, float and code aggregates of the members are
+    cached and recomputed on push and pop, so members should only be
+    changed through those methods.
+    """
+
+    __slots__ = ('row', 'col', 'members', '_aggregates')
 
     def __init__(self, row: int, col: int, members: list = None):
         """Initialize the cell.
@@ -24,6 +34,7 @@ class Cell(object):
             self.members = []
         else:
             self.members = members
+        self._aggregate()
 
     @property
     def location(self) -> tuple:
@@ -41,10 +52,7 @@ class Cell(object):
         Returns:
             bool: True if the cell is movable, False otherwise.
         """
-        for member in self.members:
-            if not member.movable:
-                return False
-        return True
+        return self._aggregates[0]
 
     @property
     def move_cost(self) -> float:
@@ -53,13 +61,7 @@ class Cell(object):
         Returns:
             float: The cost of moving into the cell.
         """
-        if not self.movable:
-            return HIGH_COST
-
-        for member in self.members:
-            if member.move_cost != const.DEFAULT_COST:
-                return member.move_cost
-        return const.DEFAULT_COST
+        return self._aggregates[1]
 
     @property
     def is_goal(self):
@@ -68,10 +70,7 @@ class Cell(object):
         Returns:
             bool: True if the cell is a goal, False otherwise.
         """
-        for member in self.members:
-            if member.is_goal:
-                return True
-        return False
+        return self._aggregates[2]
 
     @property
     def is_empty(self):
@@ -82,7 +81,7 @@ class Cell(object):
         """
         return len(self.members) == 0
 
-    @beartype
+    @checked
     def pop(self, element: object) -> object:
         """Remove an element from the cell members.
 
@@ -93,9 +92,10 @@ class Cell(object):
             object: The element that was removed.
         """
         self.members.remove(element)
+        self._aggregate()
         return element
 
-    @beartype
+    @checked
     def push(self, element: object):
         """Add an element to the cell members.
 
@@ -103,8 +103,9 @@ class Cell(object):
             element (object): The element to be added.
         """
         self.members.append(element)
+        self._aggregate()
 
-    @beartype
+    @checked
     def __str__(self) -> str:
         """Return a string representation of the cell.
 
@@ -117,13 +118,41 @@ class Cell(object):
             )
         return '|_|'
 
-    @beartype
+    @checked
     def to_float(self) -> float:
         """Return the cell as a float.
 
         Returns:
             float: The cell as a float.
         """
-        if self.members:
-            return sum(member.to_float() for member in self.members)
-        return float(0)
+        return self._aggregates[3]
+
+    @checked
+    def to_code(self) -> int:
+        """Return the cell as a uint8 observation code.
+
+        Returns:
+            int: The combined codes of the members.
+        """
+        return self._aggregates[4]
+
+    def _aggregate(self):
+        """Recompute the cached aggregates of the members."""
+        if not self.members:
+            self._aggregates = _EMPTY
+            return
+        movable = True
+        move_cost = const.DEFAULT_COST
+        is_goal = False
+        value = 0.0
+        code = 0
+        for member in self.members:
+            movable = movable and member.movable
+            if move_cost == const.DEFAULT_COST:
+                move_cost = member.move_cost
+            is_goal = is_goal or member.is_goal
+            value += member.to_float()
+            code |= member.to_code()
+        self._aggregates = (
+            movable, move_cost if movable else HIGH_COST, is_goal, value, code,
+        )
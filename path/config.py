@@ -0,0 +1,52 @@
+"""Package configuration.
+
+Runtime type checks with beartype are on by default. They can be turned
+off for production runs by setting the PATH_FINDING_CHECKS environment
+variable to 0, or by calling configure(checks=False) before importing the
+modules of the package. The setting is read when a module is imported, so
+checked functions of modules that were already imported do not change.
+"""
+
+import os
+
+from beartype import beartype
+
+CHECKS_VARIABLE = 'PATH_FINDING_CHECKS'
+
+_settings = {
+    'checks': os.environ.get(CHECKS_VARIABLE, '1') != '0',
+}
+
+
+def configure(checks: bool | None = None):
+    """Change the configuration of the package.
+
+    Args:
+        checks (bool | None): Whether to type check at runtime, unchanged if
+            None.
+    """
+    if checks is not None:
+        _settings['checks'] = checks
+
+
+def checks_enabled() -> bool:
+    """Return if runtime type checks are enabled.
+
+    Returns:
+        bool: True if functions are wrapped with beartype.
+    """
+    return _settings['checks']
+
+
+def checked(func):
+    """Wrap a function with beartype if runtime type checks are enabled.
+
+    Args:
+        func: The function.
+
+    Returns:
+        The wrapped function, or the function itself if checks are off.
+    """
+    if _settings['checks']:
+        return beartype(func)
+    return func
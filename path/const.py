@@ -16,3 +16,17 @@ ACTION_MAP = {
     'right': 3,
 }
 ACTION_MAP_REV = {vl: key for key, vl in ACTION_MAP.items()}
+
+# (row, col) offset of each action, indexed by action
+ACTION_DELTAS = (
+    (-1, 0),
+    (1, 0),
+    (0, -1),
+    (0, 1),
+)
+
+# bit flags of the uint8 observation codes, summed per cell like the floats
+OBSTACLE_CODE = 1
+TRAP_CODE = 2
+GOAL_CODE = 4
+AGENT_CODE = 8
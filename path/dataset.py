@@ -0,0 +1,283 @@
+"""Generation of expert demonstrations for bootstrapping agents."""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from path import const
+from path.environment import FIELD_SOLVER, Environment, get_ground_truths
+
+# episodes handed to a worker at once
+CHUNK_SIZE = 16
+
+
+def _generate_episodes(
+    size: tuple, seeds: list, solver: str, encoding: str,
+) -> tuple:
+    """Generate the ground truth of one episode per seed.
+
+    Each episode is the first reset of the environment seeded with its
+    seed, the global numpy random state is left untouched.
+
+    Args:
+        size (tuple): The size of the grid.
+        seeds (list): The seed of each episode.
+        solver (str): The ground truth solver.
+        encoding (str): The observation encoding.
+
+    Returns:
+        tuple: The concatenated states, actions, terminals and rewards.
+    """
+    env = Environment(size, solver=solver, encoding=encoding)
+    states, actions, terminal, reward = [], [], [], []
+    for seed in seeds:
+        env.rng = np.random.default_rng(seed)
+        env.reset()
+        trajectory = env.ground_truth
+        states.append(trajectory.states())
+        actions.append(trajectory.actions)
+        terminal.append(trajectory.dones)
+        reward.append(trajectory.rewards)
+    return (
+        np.concatenate(states),
+        np.concatenate(actions),
+        np.concatenate(terminal),
+        np.concatenate(reward).astype(np.float32),
+    )
+
+
+def generate_expert_dataset(
+    n_episodes: int,
+    size: tuple = (8, 8),
+    workers: int = 1,
+    seed: int = 0,
+    solver: str = FIELD_SOLVER,
+    encoding: str = 'float',
+) -> dict:
+    """Generate expert episodes in a process pool.
+
+    Every episode gets its own seed drawn from seed, so the result does not
+    depend on the number of workers. The keys of the result match the
+    arguments of tensorforce's Agent.experience(), and episode boundaries
+    are marked by the terminal flags.
+
+    Args:
+        n_episodes (int): The number of episodes.
+        size (tuple): The size of the grid.
+        workers (int): The number of worker processes, 1 runs inline.
+        seed (int): The seed of the dataset.
+        solver (str): The ground truth solver.
+        encoding (str): The observation encoding of the states.
+
+    Returns:
+        dict: The states, actions, terminal and reward arrays.
+    """
+    seeds = np.random.SeedSequence(seed).generate_state(n_episodes).tolist()
+    chunks = [
+        seeds[start:start + CHUNK_SIZE]
+        for start in range(0, n_episodes, CHUNK_SIZE)
+    ]
+    sizes = [size] * len(chunks)
+    solvers = [solver] * len(chunks)
+    encodings = [encoding] * len(chunks)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                _generate_episodes, sizes, chunks, solvers, encodings,
+            ))
+    else:
+        results = list(map(
+            _generate_episodes, sizes, chunks, solvers, encodings,
+        ))
+
+    states, actions, terminal, reward = zip(*results)
+    return {
+        'states': np.concatenate(states),
+        'actions': np.concatenate(actions),
+        'terminal': np.concatenate(terminal),
+        'reward': np.concatenate(reward),
+    }
+
+
+def expert_episodes(
+    n_episodes: int,
+    size: tuple = (8, 8),
+    seed: int = 0,
+    starts_per_layout: int = 1,
+    **kwargs,
+):
+    """Generate expert episodes one at a time.
+
+    Each layout is solved once, and its episodes start from the agent start
+    of the reset plus distinct random other starts connected to the goal,
+    fewer on layouts without enough of them.
+
+    Args:
+        n_episodes (int): The number of episodes.
+        size (tuple): The size of the grid.
+        seed (int): The seed of the layouts and starts.
+        starts_per_layout (int): The number of episodes of each layout.
+        kwargs: The other arguments of the Environment.
+
+    Yields:
+        Trajectory: The ground truth of an episode.
+    """
+    # independent streams for the layouts and the extra starts
+    layout_seed, start_seed = np.random.SeedSequence(seed).spawn(2)
+    env = Environment(
+        size, seed=int(layout_seed.generate_state(1)[0]), **kwargs,
+    )
+    rng = np.random.default_rng(start_seed)
+    produced = 0
+    try:
+        while produced < n_episodes:
+            env.reset()
+            starts = [env.start]
+            extra = min(starts_per_layout, n_episodes - produced) - 1
+            if extra > 0:
+                candidates = (
+                    np.isfinite(env.field[0]).reshape(env.gr.size)
+                    & ~env.gr.goal
+                    & (env.gr.cost == const.DEFAULT_COST)
+                )
+                candidates[env.start] = False
+                candidates = np.flatnonzero(candidates)
+                picks = rng.choice(
+                    candidates, min(extra, len(candidates)), replace=False,
+                )
+                starts.extend(zip(*np.divmod(picks, env.cols)))
+            for trajectory in get_ground_truths(env, starts):
+                produced += 1
+                yield trajectory
+    finally:
+        env.close()
+
+
+class ExperienceBatcher(object):
+    """Packs episodes into reused arrays of experiences.
+
+    The arrays grow to fit the largest batch and are reused afterwards, so
+    each batch is a view that is overwritten by the next one. The keys of a
+    batch match the arguments of tensorforce's Agent.experience().
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """Initialize the batcher.
+
+        Args:
+            capacity (int): The initial number of steps of the arrays.
+        """
+        self.capacity = capacity
+        self._states = None
+        self._actions = np.empty(capacity, dtype=np.int64)
+        self._terminal = np.empty(capacity, dtype=bool)
+        self._reward = np.empty(capacity, dtype=np.float32)
+
+    def pack(self, episodes: list) -> dict:
+        """Pack episodes into a batch.
+
+        Args:
+            episodes (list): The Trajectory of each episode.
+
+        Returns:
+            dict: Views of the states, actions, terminal and reward arrays.
+        """
+        steps = sum(len(episode) for episode in episodes)
+        offset = 0
+        for idx, episode in enumerate(episodes):
+            end = offset + len(episode)
+            states = episode.states()
+            if idx == 0 and (self._states is None or steps > self.capacity):
+                self._grow(steps, states)
+            _assign(self._states, offset, end, states)
+            self._actions[offset:end] = episode.actions
+            self._terminal[offset:end] = episode.dones
+            self._reward[offset:end] = episode.rewards
+            offset = end
+        return {
+            'states': _head(self._states, steps),
+            'actions': self._actions[:steps],
+            'terminal': self._terminal[:steps],
+            'reward': self._reward[:steps],
+        }
+
+    def batches(self, episodes, episodes_per_batch: int):
+        """Pack a stream of episodes into batches.
+
+        Args:
+            episodes: The iterable of Trajectory.
+            episodes_per_batch (int): The number of episodes per batch, the
+                last batch may have fewer.
+
+        Yields:
+            dict: The batch, see pack().
+        """
+        pending = []
+        for episode in episodes:
+            pending.append(episode)
+            if len(pending) == episodes_per_batch:
+                yield self.pack(pending)
+                pending = []
+        if pending:
+            yield self.pack(pending)
+
+    def _grow(self, steps: int, states):
+        """Allocate arrays that fit a number of steps.
+
+        Args:
+            steps (int): The number of steps.
+            states: The states of an episode, to take their shape from.
+        """
+        if steps > self.capacity:
+            self.capacity = max(steps, 2 * self.capacity)
+            self._actions = np.empty(self.capacity, dtype=np.int64)
+            self._terminal = np.empty(self.capacity, dtype=bool)
+            self._reward = np.empty(self.capacity, dtype=np.float32)
+        self._states = _allocate(states, self.capacity)
+
+
+def _allocate(states, capacity: int):
+    """Allocate an array, or dict of arrays, for the states of many steps.
+
+    Args:
+        states: The states of an episode.
+        capacity (int): The number of steps.
+
+    Returns:
+        The empty array or dict of arrays.
+    """
+    if isinstance(states, dict):
+        return {key: _allocate(vl, capacity) for key, vl in states.items()}
+    return np.empty((capacity,) + states.shape[1:], dtype=states.dtype)
+
+
+def _assign(buffer, start: int, end: int, states):
+    """Copy the states of an episode into an array or dict of arrays.
+
+    Args:
+        buffer: The array or dict of arrays.
+        start (int): The first step to write.
+        end (int): The step after the last to write.
+        states: The states of the episode.
+    """
+    if isinstance(buffer, dict):
+        for key, vl in buffer.items():
+            vl[start:end] = states[key]
+    else:
+        buffer[start:end] = states
+
+
+def _head(buffer, steps: int):
+    """Return the first steps of an array or dict of arrays.
+
+    Args:
+        buffer: The array or dict of arrays.
+        steps (int): The number of steps.
+
+    Returns:
+        The view or dict of views.
+    """
+    if isinstance(buffer, dict):
+        return {key: vl[:steps] for key, vl in buffer.items()}
+    return buffer[:steps]
@@ -1,14 +1,15 @@
 """Module for grid elements."""
 
-from beartype import beartype
-
 from path import const
 from path.cell import Cell
+from path.config import checked
 
 
 class Element(object):
     """Base grid element class."""
 
+    __slots__ = ('movable', 'cell')
+
     def __init__(self, movable: bool, cell: Cell | None = None):
         """Initialize the element.
 
@@ -37,7 +38,7 @@ class Element(object):
         """
         return const.DEFAULT_COST
 
-    @beartype
+    @checked
     def move(self, cell: Cell) -> None:
         """Move the element to a new cell.
 
@@ -58,11 +59,13 @@ class Element(object):
 class Obstacle(Element):
     """Obstacle element class."""
 
+    __slots__ = ()
+
     def __init__(self):
         """Initialize the obstacle."""
         super().__init__(movable=False)
 
-    @beartype
+    @checked
     def __str__(self) -> str:
         """Return a string representation of the obstacle.
 
@@ -71,7 +74,7 @@ class Obstacle(Element):
         """
         return '#'
 
-    @beartype
+    @checked
     def to_float(self) -> float:
         """Return the element as a float.
 
@@ -80,10 +83,21 @@ class Obstacle(Element):
         """
         return const.OBSTACLE_FLOAT
 
+    @checked
+    def to_code(self) -> int:
+        """Return the element as a uint8 observation code.
+
+        Returns:
+            int: The element as a code.
+        """
+        return const.OBSTACLE_CODE
+
 
 class Trap(Element):
     """Trap element class."""
 
+    __slots__ = ('cost',)
+
     def __init__(self, cost: float = 2):
         """Initialize the trap.
 
@@ -102,7 +116,7 @@ class Trap(Element):
         """
         return self.cost
 
-    @beartype
+    @checked
     def __str__(self) -> str:
         """Return a string representation of the trap.
 
@@ -111,7 +125,7 @@ class Trap(Element):
         """
         return '%'
 
-    @beartype
+    @checked
     def to_float(self) -> float:
         """Return the element as a float.
 
@@ -120,10 +134,21 @@ class Trap(Element):
         """
         return const.TRAP_FLOAT
 
+    @checked
+    def to_code(self) -> int:
+        """Return the element as a uint8 observation code.
+
+        Returns:
+            int: The element as a code.
+        """
+        return const.TRAP_CODE
+
 
 class Goal(Element):
     """Goal element class."""
 
+    __slots__ = ()
+
     def __init__(self):
         """Initialize the goal."""
         super().__init__(movable=True)
@@ -137,7 +162,7 @@ class Goal(Element):
         """
         return True
 
-    @beartype
+    @checked
     def __str__(self) -> str:
         """Return a string representation of the goal.
 
@@ -146,7 +171,7 @@ class Goal(Element):
         """
         return 'G'
 
-    @beartype
+    @checked
     def to_float(self) -> float:
         """Return the goal as a float.
 
@@ -154,3 +179,12 @@ class Goal(Element):
             float: The goal as a float.
         """
         return const.GOAL_FLOAT
+
+    @checked
+    def to_code(self) -> int:
+        """Return the goal as a uint8 observation code.
+
+        Returns:
+            int: The goal as a code.
+        """
+        return const.GOAL_CODE
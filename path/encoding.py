@@ -0,0 +1,60 @@
+"""Compact uint8 encoding of observations."""
+
+import numpy as np
+
+from path import const
+
+_FLAGS = (
+    (const.OBSTACLE_CODE, const.OBSTACLE_FLOAT),
+    (const.TRAP_CODE, const.TRAP_FLOAT),
+    (const.GOAL_CODE, const.GOAL_FLOAT),
+    (const.AGENT_CODE, const.AGENT_FLOAT),
+)
+
+# float value of every combination of flags, indexed by code
+FLOAT_TABLE = np.array(
+    [
+        sum(value for flag, value in _FLAGS if code & flag)
+        for code in range(16)
+    ],
+    dtype=np.float32,
+)
+_SORTED_CODES = np.argsort(FLOAT_TABLE).astype(np.uint8)
+_SORTED_FLOATS = FLOAT_TABLE[_SORTED_CODES]
+
+
+def decode(codes: np.ndarray) -> np.ndarray:
+    """Decode uint8 observation codes to the float representation.
+
+    Args:
+        codes (np.ndarray): The codes.
+
+    Returns:
+        np.ndarray: The float32 observation.
+    """
+    return FLOAT_TABLE[codes]
+
+
+def encode(observation: np.ndarray) -> np.ndarray:
+    """Encode a float observation to uint8 codes.
+
+    Every combination of flags has a distinct float value, so each cell is
+    matched to the nearest entry of FLOAT_TABLE.
+
+    Args:
+        observation (np.ndarray): The float observation.
+
+    Returns:
+        np.ndarray: The codes.
+
+    Raises:
+        ValueError: If a value does not match any combination of flags.
+    """
+    pos = np.searchsorted(_SORTED_FLOATS, observation)
+    pos = np.clip(pos, 1, len(_SORTED_FLOATS) - 1)
+    lower = _SORTED_FLOATS[pos - 1]
+    upper = _SORTED_FLOATS[pos]
+    pos = np.where(observation - lower < upper - observation, pos - 1, pos)
+    if not np.allclose(_SORTED_FLOATS[pos], observation, atol=1e-5):
+        raise ValueError('Observation is not a combination of elements.')
+    return _SORTED_CODES[pos]
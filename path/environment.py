@@ -3,41 +3,208 @@ from copy import deepcopy
 
 import gym
 import numpy as np
-from beartype import beartype
-from scipy.sparse.csgraph import dijkstra
 
 from path import const
 from path.agent import Agent
-from path.elements import Goal, Obstacle, Trap
+from path.config import checked
+from path.elements import Goal
+from path.encoding import FLOAT_TABLE
 from path.grid import Grid
-from path.ground_truth import adjacency_matrix, get_path, loc_to_idx, path_to_actions
+from path.layout import generate_layout, reachable_mask
+from path.maps import MAP_GENERATORS
+from path.pool import LayoutPool
+from path.prefetch import Prefetcher
+from path.profiling import NO_PHASE, Profiler
+from path.pyramid import Pyramid
+from path.trajectory import Trajectory
+from path.ground_truth import (
+    SOLVERS,
+    UNREACHABLE,
+    distance_field,
+    field_path,
+    field_paths,
+    loc_to_idx,
+    path_to_actions,
+    paths_to_actions,
+    shortest_path,
+)
+
+# solver that walks the cached distance field of the environment
+FIELD_SOLVER = 'field'
+
+# observation encodings, see path.encoding for decoding codes to floats
+ENCODINGS = ('float', 'uint8')
+
+# observation views, the entire grid, a window centered on the agent, or
+# that window with pooled summaries of the grid, see path.pyramid
+VIEWS = ('full', 'window', 'pyramid')
 
 
 class Environment(gym.Env):
     """OpenAI Gym environment for pathfinding."""
 
-    def __init__(self, size: tuple = (8, 8)):
+    def __init__(
+        self,
+        size: tuple = (8, 8),
+        copy_observation: bool = False,
+        solver: str = FIELD_SOLVER,
+        encoding: str = 'float',
+        obstacles: int = 0,
+        traps: int = 0,
+        generator: str | None = None,
+        seed: int | None = None,
+        layouts: int | None = None,
+        pool_size: int = 0,
+        view: str = 'full',
+        window: int = 9,
+        pyramid: tuple = (8,),
+        profile: bool = False,
+        prefetch: int = 0,
+        prefetch_field: bool = False,
+    ):
         """Initialize the environment.
 
+        By default step() and reset() return a read-only view of the
+        observation buffer of the grid. The view aliases the grid, so it is
+        overwritten by the next step; callers that keep observations around
+        should copy them, or set copy_observation.
+
         Args:
             size (tuple): The size of the grid.
+            copy_observation (bool): Whether to return a copy of the buffer.
+            solver (str): The ground truth solver, either FIELD_SOLVER to
+                walk the cached distance field or one of SOLVERS.
+            encoding (str): The observation encoding, 'float' for float32
+                values or 'uint8' for the codes of path.encoding.
+            obstacles (int): The number of random obstacles per layout.
+            traps (int): The number of random traps per layout.
+            generator (str | None): The map generator of each layout, one
+                of path.maps.MAP_GENERATORS, or None for an open map.
+            seed (int | None): The seed of the layouts. Each reset draws a
+                layout seed from it, stored in layout_seed, which
+                regenerates the layout exactly. If None, layouts are drawn
+                from the global numpy random state.
+            layouts (int | None): If set, resets pick one of this many
+                fixed layouts derived from seed, with a new agent start
+                anywhere connected to the goal.
+            pool_size (int): The number of those layouts kept in a
+                LayoutPool with their distance fields, 0 to rebuild the
+                layout on every reset.
+            view (str): The observation view, 'full' for the entire grid,
+                'window' for a window centered on the agent, where cells
+                outside of the grid read as obstacles, or 'pyramid' for a
+                dict of that window and max and mean pooled summaries of
+                the grid.
+            window (int): The odd width of the window and pyramid views.
+            pyramid (tuple): The output sizes of the pooled summaries of the
+                pyramid view.
+            profile (bool): Whether to time the phases of step and reset.
+                The timings of each step are returned in its info dict
+                under 'profile', and aggregated by stats().
+            prefetch (int): The number of layouts a background thread keeps
+                ready for the next resets, 0 to generate them in reset().
+                The layouts are the same as without prefetching. Call
+                close() to stop the thread.
+            prefetch_field (bool): Whether the background thread also
+                solves the distance field of each layout.
+
+        Raises:
+            ValueError: If the solver, encoding, generator or view is
+                unknown, if the window width is even, if the pyramid view
+                is not float encoded, or if layouts, pool_size or prefetch
+                are set without their requirements.
         """
+        if solver != FIELD_SOLVER and solver not in SOLVERS:
+            raise ValueError('Unknown solver {}'.format(solver))
+        if encoding not in ENCODINGS:
+            raise ValueError('Unknown encoding {}'.format(encoding))
+        if generator is not None and generator not in MAP_GENERATORS:
+            raise ValueError('Unknown generator {}'.format(generator))
+        if view not in VIEWS:
+            raise ValueError('Unknown view {}'.format(view))
+        if window % 2 == 0:
+            raise ValueError('Window width must be odd')
+        if view == 'pyramid' and encoding != 'float':
+            raise ValueError('Pyramid view requires float encoding')
+        if layouts is not None and seed is None:
+            raise ValueError('layouts requires a seed')
+        if pool_size and layouts is None:
+            raise ValueError('pool_size requires layouts')
+        if prefetch and seed is None:
+            raise ValueError('prefetch requires a seed')
+        if prefetch and layouts is not None:
+            raise ValueError('prefetch can not be combined with layouts')
         self.rows = size[0]
         self.cols = size[1]
-        self.ground_truth = None
+        self.copy_observation = copy_observation
+        self.solver = solver
+        self.encoding = encoding
+        self.view = view
+        self.window = None if view == 'full' else window
+        self.pyramid = pyramid if view == 'pyramid' else None
+        self._pyramid = None
+        self.obstacles = obstacles
+        self.traps = traps
+        self.generator = generator
+        self.rng = None if seed is None else np.random.default_rng(seed)
+        self.layout_seed = None
+        self.layout_seeds = None
+        if layouts is not None:
+            self.layout_seeds = np.random.SeedSequence(seed).generate_state(
+                layouts,
+            )
+        self.pool = LayoutPool(pool_size) if pool_size else None
+        self.profiler = Profiler() if profile else None
+        self.start = None
+        self._ground_truth = None
+
+        # distance field of the last seen layout
+        self._field = None
+        self._field_key = None
+        self._field_grid = None
+        self._field_version = -1
 
         # action space of 4
         self.action_space = gym.spaces.Discrete(4)
-        self.observation_space = gym.spaces.Box(
-            low=0,
-            high=1,
-            shape=(self.rows, self.cols),
-            dtype=np.float32,
-        )
+        if self.window is None:
+            shape = (self.rows, self.cols)
+        else:
+            shape = (self.window, self.window)
+        if encoding == 'uint8':
+            self.observation_space = gym.spaces.Box(
+                low=0,
+                high=len(FLOAT_TABLE) - 1,
+                shape=shape,
+                dtype=np.uint8,
+            )
+        else:
+            self.observation_space = gym.spaces.Box(
+                low=0,
+                high=1,
+                shape=shape,
+                dtype=np.float32,
+            )
+        if self.pyramid is not None:
+            spaces = {'window': self.observation_space}
+            for size in self.pyramid:
+                for summary in ('max', 'mean'):
+                    spaces['{0}{1}'.format(summary, size)] = gym.spaces.Box(
+                        low=0,
+                        high=1,
+                        shape=(size, size),
+                        dtype=np.float32,
+                    )
+            self.observation_space = gym.spaces.Dict(spaces)
         self.reward_range = (-10, 10)
 
         self.gr = Grid((self.rows, self.cols))
 
+        # started last, the thread reads the configuration above
+        self.prefetch_field = prefetch_field
+        self.prefetcher = None
+        if prefetch:
+            self.prefetcher = Prefetcher(self._generate_layout, prefetch)
+
     def step(self, action: int) -> tuple[np.ndarray, float, bool, dict]:
         """Perform an action and return the next state, reward, and done flag.
 
@@ -50,146 +217,562 @@ class Environment(gym.Env):
             bool: True if the episode is done, False otherwise.
             dict: Additional information.
         """
-        prev_cell = self.agent.cell
-        done = False
-        reward = 0
-        agent_row, agent_col = self.agent.cell.location
-
         if action not in range(4):
             raise ValueError('Invalid action {}'.format(action))
+        if self.profiler is None:
+            src = self._move(action)
+            reward, done = self._reward(src)
+            return self.observe(), reward, done, {}
+
+        with self.profiler.phase('step'):
+            with self.profiler.phase('move'):
+                src = self._move(action)
+            with self.profiler.phase('reward'):
+                reward, done = self._reward(src)
+            with self.profiler.phase('observe'):
+                state = self.observe()
+
+        self._count_step(reward, done)
+        info = {
+            'profile': {
+                name: self.profiler.last[name]
+                for name in ('step', 'move', 'reward', 'observe')
+            },
+        }
+        return state, reward, done, info
 
-        # move up
-        if action == 0:
-            self.gr.move(
-                self.agent, (agent_row - 1, agent_col),
-            )
-        # move down
-        elif action == 1:
-            self.gr.move(
-                self.agent, (agent_row + 1, agent_col),
-            )
-        # move left
-        elif action == 2:
-            self.gr.move(
-                self.agent, (agent_row, agent_col - 1),
-            )
-        # move right
-        elif action == 3:
-            self.gr.move(
-                self.agent, (agent_row, agent_col + 1),
-            )
+    def reset(self) -> np.ndarray:
+        """Reset the environment.
 
+        Returns:
+            ndarray: The state of the environment.
+        """
+        if self.profiler is None:
+            self._reset_layout()
+            return self.observe()
+
+        with self.profiler.phase('reset'):
+            with self.profiler.phase('layout'):
+                self._reset_layout()
+            with self.profiler.phase('observe'):
+                state = self.observe()
+        self.profiler.count('resets')
+        return state
+
+    def _move(self, action: int) -> tuple:
+        """Move the agent by an action.
+
+        Args:
+            action (int): The action.
+
+        Returns:
+            tuple: The row and column of the agent before the move.
+        """
+        agent_row, agent_col = self.gr.agent_location
+        row_delta, col_delta = const.ACTION_DELTAS[action]
+        self.gr.move_agent((agent_row + row_delta, agent_col + col_delta))
+        return agent_row, agent_col
+
+    def _reward(self, src: tuple) -> tuple:
+        """Return the reward and done flag of a move.
+
+        Args:
+            src (tuple): The row and column of the agent before the move.
+
+        Returns:
+            float: The reward.
+            bool: True if the agent reached the goal, False otherwise.
+        """
+        done = False
+        reward = 0
         # check if agent is at goal
-        if self.agent.cell.is_goal:
+        if self.gr.goal[self.gr.agent_location]:
             done = True
             reward = 10
-        if self.agent.cell == prev_cell:
+        if self.gr.agent_location == src:
             reward = -10
         else:
             reward = -1
+        return reward, done
 
-        return self.gr.as_float(), reward, done, {}
+    def _reset_layout(self):
+        """Load the layout of a new episode and place the agent."""
+        if self.layout_seeds is None:
+            start = self._new_layout()
+        else:
+            start = self._fixed_layout()
 
-    def reset(self) -> np.ndarray:
-        """Reset the environment.
+        self.agent = Agent()
+        self.gr.place(self.agent, start)
+
+        # layouts only draw starts connected to the goal, so the ground
+        # truth exists and is solved when it is first read
+        self.start = start
+        self._ground_truth = None
+
+    @property
+    def ground_truth(self) -> Trajectory | None:
+        """Return the ground truth of the episode from the agent start.
+
+        The ground truth is solved on first access and memoized until the
+        next reset.
 
         Returns:
-            ndarray: The state of the environment.
+            Trajectory | None: The ground truth, None before the first
+                reset.
         """
-        self.gr = Grid((self.rows, self.cols))
+        if self._ground_truth is None and self.start is not None:
+            with self._phase('solver'):
+                self._ground_truth = get_ground_truth(
+                    self, render=False, start=self.start,
+                )
+        return self._ground_truth
 
-        # barrier around edge of grid
-        for row in range(self.rows):
-            self.gr.place(Obstacle(), (row, 0))
-            self.gr.place(Obstacle(), (row, self.cols - 1))
-        for col in range(self.cols):
-            self.gr.place(Obstacle(), (0, col))
-            self.gr.place(Obstacle(), (self.rows - 1, col))
+    def stats(self) -> dict:
+        """Return the aggregate instrumentation of the environment.
 
-        # place random obstacles
-        # for _ in range(3):
-        #     self.gr.place_random(Obstacle())
+        Returns:
+            dict: The phases and counters of the profiler, empty if the
+                environment is not profiled, and the counters of the
+                layout pool if there is one.
+        """
+        res = {'phases': {}, 'counters': {}}
+        if self.profiler is not None:
+            res = self.profiler.stats()
+        if self.pool is not None:
+            res['pool'] = self.pool.stats()
+        return res
 
-        # place random traps
-        # for _ in range(20):
-        #     self.gr.place_random(Trap())
+    def _phase(self, name: str):
+        """Return a context that times a phase if the environment is profiled.
 
-        self.goal = Goal()
-        self.agent = Agent()
+        Args:
+            name (str): The name of the phase.
+
+        Returns:
+            The timing context, or a shared no-op context.
+        """
+        if self.profiler is None:
+            return NO_PHASE
+        return self.profiler.phase(name)
+
+    def _count_step(self, reward: float, done: bool):
+        """Update the step counters of the profiler.
+
+        Args:
+            reward (float): The reward of the step.
+            done (bool): Whether the step reached the goal.
+        """
+        self.profiler.count('steps')
+        if reward == -10:
+            self.profiler.count('blocked')
+        if done:
+            self.profiler.count('episodes')
+
+    def _new_layout(self) -> tuple:
+        """Load a new layout, from the prefetcher if there is one.
+
+        Returns:
+            tuple: The agent start of the layout.
+        """
+        if self.prefetcher is None:
+            entry = self._generate_layout()
+        else:
+            entry = self.prefetcher.get()
+        seed, self.gr, self.goal, self._pyramid, start, field = entry
+        if seed is not None:
+            self.layout_seed = seed
+        if field is not None:
+            self._field, self._field_key = field
+            self._field_grid = self.gr
+            self._field_version = self.gr.layout_version
+        return start
+
+    def _generate_layout(self) -> tuple:
+        """Generate a new layout and build its grid.
+
+        Runs in the prefetch thread when prefetching, so it only uses rng
+        and the configuration of the environment.
+
+        Returns:
+            tuple: The layout seed, grid, goal, pyramid, agent start, and
+                the distance field and its key if prefetch_field is set.
+        """
+        seed = None
+        rng = None
+        if self.rng is not None:
+            seed = int(self.rng.integers(2 ** 32))
+            rng = np.random.default_rng(seed)
+        layout = generate_layout(
+            (self.rows, self.cols),
+            obstacles=self.obstacles,
+            traps=self.traps,
+            goal=(self.rows - 2, self.cols - 2),
+            generator=MAP_GENERATORS.get(self.generator),
+            rng=rng,
+        )
+        grid, goal, pyramid = self._build_grid(
+            layout.obstacle, layout.cost, layout.goal,
+        )
+        field = None
+        if self.prefetch_field:
+            goal_idx = loc_to_idx(layout.goal[0], layout.goal[1], self.cols)
+            field = (distance_field(grid, goal_idx), _layout_key(grid))
+        return seed, grid, goal, pyramid, layout.start, field
 
-        # goal should be placed first
-        self.gr.place(self.goal, (self.rows - 2, self.cols - 2))
-        self.gr.place_random(self.agent)
+    def _fixed_layout(self) -> tuple:
+        """Load one of the fixed layouts, from the pool if possible.
 
-        # regenerate if no path exists
-        try:
-            self.ground_truth = get_ground_truth(self, render=False)
-        except ValueError as err:
-            print(err)
-            self.reset()
-        return self.gr.as_float()
+        Returns:
+            tuple: A random agent start connected to the goal.
+        """
+        self.layout_seed = int(self.rng.choice(self.layout_seeds))
+        goal = (self.rows - 2, self.cols - 2)
+        entry = None
+        if self.pool is not None:
+            entry = self.pool.get(self.layout_seed)
+
+        if entry is None:
+            layout = generate_layout(
+                (self.rows, self.cols),
+                obstacles=self.obstacles,
+                traps=self.traps,
+                goal=goal,
+                generator=MAP_GENERATORS.get(self.generator),
+                rng=np.random.default_rng(self.layout_seed),
+            )
+            self._load_layout(layout.obstacle, layout.cost, goal)
+            if self.pool is not None:
+                self.pool.put(self.layout_seed, (
+                    layout.obstacle, layout.cost, self.field, self._field_key,
+                ))
+        else:
+            obstacle, cost, self._field, self._field_key = entry
+            self._load_layout(obstacle, cost, goal)
+
+        if self.pool is None:
+            starts = reachable_mask(self.gr.obstacle, goal)
+        else:
+            distances, _ = self.field
+            starts = np.isfinite(distances).reshape(self.gr.size)
+        starts = (
+            starts
+            & ~self.gr.goal
+            & (self.gr.cost == const.DEFAULT_COST)
+        )
+        return divmod(int(self.rng.choice(np.flatnonzero(starts))), self.cols)
+
+    def _load_layout(
+        self, obstacle: np.ndarray, cost: np.ndarray, goal: tuple,
+    ):
+        """Build a new grid from layout layers and place the goal.
+
+        Args:
+            obstacle (np.ndarray): The obstacle mask.
+            cost (np.ndarray): The cost of moving into each cell.
+            goal (tuple): The row and column of the goal.
+        """
+        self.gr, self.goal, self._pyramid = self._build_grid(
+            obstacle, cost, goal,
+        )
+
+    def _build_grid(
+        self, obstacle: np.ndarray, cost: np.ndarray, goal: tuple,
+    ) -> tuple:
+        """Build a grid from layout layers and place the goal.
+
+        Args:
+            obstacle (np.ndarray): The obstacle mask.
+            cost (np.ndarray): The cost of moving into each cell.
+            goal (tuple): The row and column of the goal.
+
+        Returns:
+            Grid: The grid.
+            Goal: The goal element.
+            Pyramid | None: The pyramid of the grid for the pyramid view.
+        """
+        pad = 0 if self.window is None else self.window // 2
+        grid = Grid((self.rows, self.cols), pad=pad)
+        grid.load(obstacle, cost)
+        pyramid = None
+        if self.pyramid is not None:
+            pyramid = Pyramid(grid, self.window, self.pyramid)
+        goal_element = Goal()
+        grid.place(goal_element, goal)
+        return grid, goal_element, pyramid
+
+    def observe(self) -> np.ndarray | dict:
+        """Return the current observation of the environment.
+
+        Returns:
+            ndarray | dict: The observation, a dict for the pyramid view.
+                See __init__ for the aliasing contract.
+        """
+        if self._pyramid is not None:
+            res = self._pyramid.observe()
+            if self.copy_observation:
+                return {key: array.copy() for key, array in res.items()}
+            return res
+        codes = self.encoding == 'uint8'
+        if self.window is not None:
+            res = self.gr.window(self.window, codes=codes)
+        elif codes:
+            res = self.gr.codes
+        else:
+            res = self.gr.observation
+        if self.copy_observation:
+            return res.copy()
+        return res
+
+    @property
+    def field(self) -> tuple:
+        """Return the distance field towards the goal of the current layout.
+
+        The field only depends on the obstacles, traps and goal, so it is
+        computed once per layout and reused across resets and agent moves.
+
+        Returns:
+            np.ndarray: The distance from each cell to the goal.
+            np.ndarray: The next cell on the path from each cell to the goal.
+        """
+        version = self.gr.layout_version
+        if self.gr is self._field_grid and version == self._field_version:
+            return self._field
+
+        key = _layout_key(self.gr)
+        if key != self._field_key:
+            goal = int(np.flatnonzero(self.gr.goal)[0])
+            self._field = distance_field(self.gr, goal)
+            self._field_key = key
+        self._field_grid = self.gr
+        self._field_version = version
+        return self._field
+
+    def invalidate_field(self):
+        """Drop the cached distance field, so the next read solves it again."""
+        self._field = None
+        self._field_key = None
+        self._field_grid = None
+        self._field_version = -1
+
+    def distance_to_goal(self, cell: tuple) -> float:
+        """Return the cost of the shortest path from a cell to the goal.
+
+        Args:
+            cell (tuple): The row and column of the cell.
+
+        Returns:
+            float: The distance to the goal, inf if unreachable.
+        """
+        distances, _ = self.field
+        return float(distances[loc_to_idx(cell[0], cell[1], self.cols)])
+
+    def is_reachable(self, cell: tuple) -> bool:
+        """Return if the goal can be reached from a cell.
+
+        Args:
+            cell (tuple): The row and column of the cell.
+
+        Returns:
+            bool: True if a path to the goal exists, False otherwise.
+        """
+        return bool(np.isfinite(self.distance_to_goal(cell)))
+
+    def optimal_action(self, cell: tuple) -> int:
+        """Return the first action of the shortest path from a cell.
+
+        Args:
+            cell (tuple): The row and column of the cell.
+
+        Returns:
+            int: The optimal action.
+
+        Raises:
+            ValueError: If the cell is the goal or can not reach it.
+        """
+        _, successors = self.field
+        idx = loc_to_idx(cell[0], cell[1], self.cols)
+        nxt = successors[idx]
+        if nxt == UNREACHABLE:
+            raise ValueError('No action from {} to goal.'.format(cell))
+        return path_to_actions([idx, int(nxt)], self.cols)[0]
 
     def render(self):
         """Render the environment."""
         print(self.gr)
 
+    def close(self):
+        """Stop the prefetch thread, if any."""
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+            self.prefetcher = None
+        super().close()
+
+    def __getstate__(self) -> dict:
+        """Return the state of the environment for copies and pickling.
+
+        Copies do not share the prefetch thread, and generate their layouts
+        in reset().
 
-@beartype
-def get_ground_truth(env: Environment, render: bool = True):
+        Returns:
+            dict: The attributes of the environment.
+        """
+        state = self.__dict__.copy()
+        state['prefetcher'] = None
+        return state
+
+
+@checked
+def get_ground_truth(
+    env: Environment,
+    render: bool = True,
+    solver: str | None = None,
+    start: tuple | None = None,
+) -> Trajectory:
     """Return the ground truth of the environment as a series of experiences.
 
+    The experiences are synthesized from the grid and the optimal actions,
+    without stepping a copy of the environment.
+
     Args:
         env (Environment): The environment.
         render (bool): Whether to render the environment.
+        solver (str | None): The solver, defaults to the solver of env.
+        start (tuple | None): The (row, col) of the start, defaults to the
+            location of the agent.
 
     Returns:
-        list: The ground truth of the environment as a series of experiences.
+        Trajectory: The ground truth of the environment as a series of
+            experiences.
     """
-    experiences = []
-    temp = deepcopy(env)
-    cols = temp.gr.size[1]
-
-    # convert grid to graph
-    adj_matrix = adjacency_matrix(temp.gr)
+    if solver is None:
+        solver = env.solver
+    if start is None:
+        start = env.gr.agent_location
+    cols = env.gr.size[1]
 
-    # run dijkstras's algorithm until shortest path is found
-    start = temp.agent.cell.location
-    goal = temp.goal.cell.location
-
-    # convert start and goal cells to adj matrix indices
+    # convert start and goal cells to flat indices
     start_idx = loc_to_idx(start[0], start[1], cols)
-    goal_idx = loc_to_idx(goal[0], goal[1], cols)
-
-    # run dijkstras's algorithm
-    _, predecessors = dijkstra(
-        adj_matrix,
-        directed=False,
-        indices=start_idx,
-        return_predecessors=True,
-    )
+    goal_idx = int(np.flatnonzero(env.gr.goal)[0])
 
     # get shortest path as a series of correct actions
-    try:
-        path = get_path(predecessors, start_idx, goal_idx)
-    except ValueError as err:
-        raise ValueError(err)
+    if solver == FIELD_SOLVER:
+        path = field_path(env.field[1], start_idx, goal_idx)
+    else:
+        path = shortest_path(env.gr, start_idx, goal_idx, solver=solver)
     actions = path_to_actions(path, cols)
 
     if render:
         print([const.ACTION_MAP_REV[action] for action in actions])
-
-    # run actions on environment
-    for action in actions:
-        res = temp.step(action)
-        experiences.append({
-            'action': action,
-            'state': res[0],
-            'reward': res[1],
-            'done': res[2],
-        })
-
-        if render:
+        temp = deepcopy(env)
+        if temp.gr.agent_location != start:
+            temp.gr.move(temp.agent, start)
+        for action in actions:
+            temp.step(action)
             temp.render()
             print('====================')
 
-    return experiences
+    base, agent = _trajectory_base(env)
+
+    # every step of a shortest path moves the agent, and only the last
+    # one reaches the goal
+    positions = np.array(path[1:], dtype=np.int64)
+    dones = np.zeros(len(actions), dtype=bool)
+    dones[-1:] = True
+    return Trajectory(
+        base=base,
+        positions=np.stack(np.divmod(positions, cols), axis=-1),
+        actions=np.array(actions, dtype=np.int64),
+        rewards=np.full(len(actions), -1, dtype=np.int64),
+        dones=dones,
+        agent=agent,
+        window=env.window,
+        pyramid=env.pyramid,
+    )
+
+
+@checked
+def get_ground_truths(env: Environment, starts) -> list:
+    """Return the ground truth of many agent starts on the current layout.
+
+    All trajectories are extracted at once from the distance field of the
+    layout, and share the observation of the grid without the agent.
+
+    Args:
+        env (Environment): The environment.
+        starts: The (row, col) of each start, of shape (n, 2).
+
+    Returns:
+        list: The Trajectory of each start.
+
+    Raises:
+        ValueError: If the goal is unreachable from a start.
+    """
+    cols = env.gr.size[1]
+    starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+    goal_idx = int(np.flatnonzero(env.gr.goal)[0])
+    paths, lengths = field_paths(
+        env.field[1], starts[:, 0] * cols + starts[:, 1], goal_idx,
+    )
+    actions = paths_to_actions(paths, cols)
+    positions = np.stack(np.divmod(paths[:, 1:], cols), axis=-1)
+    base, agent = _trajectory_base(env)
+
+    res = []
+    for idx, length in enumerate(lengths.tolist()):
+        dones = np.zeros(length, dtype=bool)
+        dones[-1:] = True
+        res.append(Trajectory(
+            base=base,
+            positions=positions[idx, :length],
+            actions=actions[idx, :length],
+            rewards=np.full(length, -1, dtype=np.int64),
+            dones=dones,
+            agent=agent,
+            window=env.window,
+            pyramid=env.pyramid,
+        ))
+    return res
+
+
+def _trajectory_base(env: Environment) -> tuple:
+    """Return the observation of the grid without the agent.
+
+    Args:
+        env (Environment): The environment.
+
+    Returns:
+        np.ndarray: The observation, padded for windows.
+        float: The value of the agent in the observation.
+    """
+    cell = env.gr[env.gr.agent_location]
+    others = [member for member in cell.members if member is not env.agent]
+    codes = env.encoding == 'uint8'
+    base = env.gr.as_padded(codes=codes)
+    pad = env.gr.pad
+    loc = (cell.row + pad, cell.col + pad)
+    if codes:
+        base[loc] = sum(member.to_code() for member in others)
+        agent = const.AGENT_CODE
+    else:
+        base[loc] = sum(member.to_float() for member in others)
+        agent = const.AGENT_FLOAT
+    if env.window is None:
+        base = base[pad:pad + env.rows, pad:pad + env.cols]
+    return base, agent
+
+
+def _layout_key(grid: Grid) -> tuple:
+    """Return the key of the layers the distance field of a grid depends on.
+
+    Args:
+        grid (Grid): The grid.
+
+    Returns:
+        tuple: The bytes of the obstacle, cost and goal layers.
+    """
+    return (
+        grid.obstacle.tobytes(),
+        grid.cost.tobytes(),
+        grid.goal.tobytes(),
+    )
@@ -1,29 +1,198 @@
 """Module for the grid."""
 
 import numpy as np
-from beartype import beartype
 
-from path.cell import Cell
-from path.elements import Element
+from path import const
+from path.agent import Agent
+from path.cell import HIGH_COST, Cell
+from path.config import checked
+from path.elements import Element, Obstacle, Trap
 
 
 class Grid(object):
-    """Grid class."""
+    """Grid class.
 
-    @beartype
-    def __init__(self, size: tuple):
+    The state of the grid is kept as a struct of typed numpy layers, which
+    the environment and ground truth code read directly:
+
+    - ``occupancy`` (uint8): number of elements in each cell.
+    - ``obstacle`` (bool): True where the cell can not be moved into.
+    - ``cost`` (float32): cost of moving into each movable cell.
+    - ``goal`` (bool): True where the cell holds a goal.
+
+    The agent position is stored as the two ints ``agent_row`` and
+    ``agent_col``. ``layout_version`` is bumped whenever the obstacle, cost
+    or goal layers change, so derived data can be cached per layout.
+
+    ``Cell`` objects are only created for cells that are accessed through
+    the object API, and serve as a view for debugging. Cells of a layout
+    loaded in bulk with load() are filled with elements matching the layers
+    when they are first accessed.
+
+    Agent moves run on the layers only, through move_agent(). The agent is
+    not a member of any cell view while it moves, and is added to the view
+    of its cell when that view is read.
+
+    The grid also keeps persistent float and uint8 code observation
+    buffers, which move() updates in place for the source and destination
+    cells only. Layers and buffers are only kept in sync when elements are
+    moved through the grid, not through Element.move() directly. The
+    buffers can be padded with obstacles, so that windows around the agent
+    are views even at the edge of the grid.
+
+    Callables in ``listeners`` are called with the location of every cell
+    that move() changes, or with None when load() replaces the whole grid.
+    """
+
+    @checked
+    def __init__(self, size: tuple, pad: int = 0):
         """Initialize the grid.
 
         Args:
             size (tuple): The size of the grid.
+            pad (int): The number of obstacle cells around the observation
+                buffers.
         """
         self.size = size
-        self.grid = np.zeros(size, dtype=Cell)
-        for row in range(size[0]):
-            for col in range(size[1]):
-                self.grid[row, col] = Cell(row, col)
+        self.occupancy = np.zeros(size, dtype=np.uint8)
+        self.obstacle = np.zeros(size, dtype=bool)
+        self.cost = np.full(size, const.DEFAULT_COST, dtype=np.float32)
+        self.goal = np.zeros(size, dtype=bool)
+        self.agent_row = -1
+        self.agent_col = -1
+        self.layout_version = 0
+        self._agent = None
+        # float and code of the cell of the agent without the agent
+        self._under = (0.0, 0)
+        self.cells = {}
+        self.listeners = []
+        self.pad = pad
+        padded = (size[0] + 2 * pad, size[1] + 2 * pad)
+        self._padded_observation = np.full(
+            padded, const.OBSTACLE_FLOAT, dtype=np.float32,
+        )
+        self._padded_codes = np.full(
+            padded, const.OBSTACLE_CODE, dtype=np.uint8,
+        )
+        self._padded_observation[pad:pad + size[0], pad:pad + size[1]] = 0
+        self._padded_codes[pad:pad + size[0], pad:pad + size[1]] = 0
+
+    @property
+    def movable(self) -> np.ndarray:
+        """Return the movable mask of the grid.
+
+        Returns:
+            np.ndarray: True where the cell can be moved into.
+        """
+        return ~self.obstacle
+
+    @property
+    def move_cost(self) -> np.ndarray:
+        """Return the cost of moving into each cell of the grid.
+
+        Returns:
+            np.ndarray: The cost of moving into each cell.
+        """
+        return np.where(self.obstacle, HIGH_COST, self.cost)
+
+    @property
+    def _observation(self) -> np.ndarray:
+        """Return the writable float buffer, without padding.
+
+        Returns:
+            np.ndarray: A view of the padded float buffer.
+        """
+        pad = self.pad
+        return self._padded_observation[
+            pad:pad + self.size[0], pad:pad + self.size[1],
+        ]
+
+    @property
+    def _codes(self) -> np.ndarray:
+        """Return the writable code buffer, without padding.
+
+        Returns:
+            np.ndarray: A view of the padded code buffer.
+        """
+        pad = self.pad
+        return self._padded_codes[
+            pad:pad + self.size[0], pad:pad + self.size[1],
+        ]
+
+    @property
+    def observation(self) -> np.ndarray:
+        """Return a read-only view of the observation buffer.
+
+        The view aliases the buffer of the grid, so its values change with
+        every move. Use as_float() to get a copy that can be kept.
+
+        Returns:
+            np.ndarray: The grid as a float, without copying.
+        """
+        view = self._observation.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Return a read-only view of the uint8 code buffer.
+
+        Like observation, the view aliases the buffer of the grid. Use
+        as_codes() to get a copy that can be kept.
+
+        Returns:
+            np.ndarray: The grid as codes, without copying.
+        """
+        view = self._codes.view()
+        view.flags.writeable = False
+        return view
+
+    def window(self, size: int, codes: bool = False) -> np.ndarray:
+        """Return a read-only view of the cells around the agent.
+
+        Cells outside of the grid read as obstacles. Like observation, the
+        view aliases the buffer of the grid.
+
+        Args:
+            size (int): The odd width of the square window, at most
+                2 * pad + 1.
+            codes (bool): Whether to view the code buffer instead of the
+                float buffer.
+
+        Returns:
+            np.ndarray: The window centered on the agent.
+        """
+        padded = self._padded_codes if codes else self._padded_observation
+        row = self.agent_row + self.pad - size // 2
+        col = self.agent_col + self.pad - size // 2
+        view = padded[row:row + size, col:col + size]
+        view.flags.writeable = False
+        return view
+
+    def as_padded(self, codes: bool = False) -> np.ndarray:
+        """Return a copy of an observation buffer with its padding.
+
+        Args:
+            codes (bool): Whether to copy the code buffer instead of the
+                float buffer.
+
+        Returns:
+            np.ndarray: The padded buffer.
+        """
+        if codes:
+            return self._padded_codes.copy()
+        return self._padded_observation.copy()
+
+    @property
+    def agent_location(self) -> tuple:
+        """Return the location of the agent.
+
+        Returns:
+            tuple: The row and column of the agent.
+        """
+        return self.agent_row, self.agent_col
 
-    @beartype
+    @checked
     def move(self, element: Element, dest: tuple) -> bool:
         """Move an element to a new cell.
 
@@ -34,13 +203,74 @@ class Grid(object):
         Returns:
             bool: True if the element was moved, False otherwise.
         """
-        cell = self.grid[dest]
-        if cell.movable:
-            element.move(cell)
-            return True
-        return False
+        dest = self._wrap(dest)
+        if isinstance(element, Agent):
+            if element is not self._agent:
+                # a new agent, the grid tracks the last one placed
+                self._agent = element
+                self.agent_row = -1
+                self.agent_col = -1
+            return self.move_agent(dest)
+        if self.obstacle[dest]:
+            return False
 
-    @beartype
+        src = None if element.cell is None else element.cell.location
+        element.move(self[dest])
+        if src is not None:
+            self._sync(src)
+        self._sync(dest)
+        return True
+
+    def move_agent(self, dest: tuple) -> bool:
+        """Move the placed agent to a new cell.
+
+        Only the layers, the buffers of the source and destination cells
+        and the listeners are updated, no cell view is built.
+
+        Args:
+            dest (tuple): The destination cell.
+
+        Returns:
+            bool: True if the agent was moved, False otherwise.
+
+        Raises:
+            ValueError: If no agent is placed.
+        """
+        if self._agent is None:
+            raise ValueError('No agent on the grid')
+        row, col = self._wrap(dest)
+        if self.obstacle[row, col]:
+            return False
+
+        agent = self._agent
+        if agent.cell is not None:
+            agent.cell.pop(agent)
+            agent.cell = None
+        pad = self.pad
+        observation = self._padded_observation
+        codes = self._padded_codes
+        src_row, src_col = self.agent_row, self.agent_col
+        if src_row >= 0:
+            self.occupancy[src_row, src_col] -= 1
+            observation[src_row + pad, src_col + pad] = self._under[0]
+            codes[src_row + pad, src_col + pad] = self._under[1]
+        self._under = (
+            float(observation[row + pad, col + pad]),
+            int(codes[row + pad, col + pad]),
+        )
+        self.occupancy[row, col] += 1
+        observation[row + pad, col + pad] = self._under[0] + const.AGENT_FLOAT
+        codes[row + pad, col + pad] = self._under[1] | const.AGENT_CODE
+        self.agent_row = row
+        self.agent_col = col
+
+        for listener in self.listeners:
+            if src_row >= 0:
+                listener((src_row, src_col))
+            listener((row, col))
+        return True
+
+    @checked
     def place(self, element: Element, dest: tuple) -> bool:
         """Place an element in a cell. Uses move().
 
@@ -53,7 +283,7 @@ class Grid(object):
         """
         return self.move(element, dest)
 
-    @beartype
+    @checked
     def get_random(self) -> tuple:
         """Return a random row and column inside the grid.
 
@@ -65,20 +295,22 @@ class Grid(object):
             np.random.randint(self.size[1]),
         )
 
-    @beartype
+    @checked
     def get_random_empty(self) -> tuple:
         """Get a random empty cell.
 
         Returns:
             tuple: A random empty cell.
+
+        Raises:
+            ValueError: If the grid has no empty cell.
         """
-        while True:
-            row, col = self.get_random()
-            cell = self.grid[row, col]
-            if cell.is_empty:
-                return row, col
+        empty = np.flatnonzero(self.occupancy == 0)
+        if not len(empty):
+            raise ValueError('No empty cell in grid.')
+        return divmod(int(np.random.choice(empty)), self.size[1])
 
-    @beartype
+    @checked
     def place_random(self, element: Element):
         """Place an element at a random movable cell.
 
@@ -87,6 +319,86 @@ class Grid(object):
         """
         self.place(element, self.get_random_empty())
 
+    def load(self, obstacle: np.ndarray, cost: np.ndarray):
+        """Replace the obstacles and traps of the grid in bulk.
+
+        Any element placed through the object API is discarded.
+
+        Args:
+            obstacle (np.ndarray): The obstacle mask.
+            cost (np.ndarray): The cost of moving into each cell.
+        """
+        trap = ~obstacle & (cost != const.DEFAULT_COST)
+        self.obstacle[...] = obstacle
+        self.cost[...] = np.where(obstacle, const.DEFAULT_COST, cost)
+        self.goal[...] = False
+        self.occupancy[...] = obstacle | trap
+        self.agent_row = -1
+        self.agent_col = -1
+        self._agent = None
+        self.layout_version += 1
+        self.cells = {}
+        self._observation[...] = (
+            obstacle * const.OBSTACLE_FLOAT + trap * const.TRAP_FLOAT
+        )
+        self._codes[...] = (
+            obstacle * const.OBSTACLE_CODE + trap * const.TRAP_CODE
+        )
+        for listener in self.listeners:
+            listener(None)
+
+    def _view(self, key: tuple) -> Cell:
+        """Create a cell with elements matching the layers at a position.
+
+        Args:
+            key (tuple): The position of the cell.
+
+        Returns:
+            Cell: The cell at the given position.
+        """
+        cell = Cell(*key)
+        if self.obstacle[key]:
+            members = [Obstacle()]
+        elif self.cost[key] != const.DEFAULT_COST:
+            members = [Trap(cost=float(self.cost[key]))]
+        else:
+            members = []
+        for member in members:
+            member.move(cell)
+        return cell
+
+    def _sync(self, loc: tuple):
+        """Update the layers of a cell from the members of its view.
+
+        Args:
+            loc (tuple): The location of the cell.
+        """
+        cell = self.cells[loc]
+        obstacle = not cell.movable
+        goal = cell.is_goal
+        cost = cell.move_cost if cell.movable else const.DEFAULT_COST
+        if (
+            obstacle != self.obstacle[loc]
+            or goal != self.goal[loc]
+            or cost != self.cost[loc]
+        ):
+            self.layout_version += 1
+
+        self.occupancy[loc] = len(cell.members)
+        self.obstacle[loc] = obstacle
+        self.goal[loc] = goal
+        self.cost[loc] = cost
+        self._observation[loc] = cell.to_float()
+        self._codes[loc] = cell.to_code()
+        if loc == self.agent_location:
+            rest = Cell(*loc, [
+                member for member in cell.members
+                if member is not self._agent
+            ])
+            self._under = (rest.to_float(), rest.to_code())
+        for listener in self.listeners:
+            listener(loc)
+
     def __str__(self):
         """Return a string representation of the grid.
 
@@ -94,8 +406,10 @@ class Grid(object):
             str: The string representation of the grid.
         """
         return '\n'.join(
-            ''.join(str(cell) for cell in row)
-            for row in self.grid
+            ''.join(
+                str(self._peek((row, col))) for col in range(self.size[1])
+            )
+            for row in range(self.size[0])
         )
 
     def __getitem__(self, key: tuple) -> Cell:
@@ -107,15 +421,52 @@ class Grid(object):
         Returns:
             Cell: The cell at the given position.
         """
-        return self.grid[key]
+        key = self._wrap(key)
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self._view(key)
+            self.cells[key] = cell
+        if key == self.agent_location and self._agent.cell is None:
+            self._agent.move(cell)
+        return cell
+
+    def _wrap(self, key: tuple) -> tuple:
+        """Return a position with negative indices wrapped into the grid.
+
+        Args:
+            key (tuple): The position, indexed like the numpy layers.
+
+        Returns:
+            tuple: The row and column, both non-negative.
+        """
+        return int(key[0]) % self.size[0], int(key[1]) % self.size[1]
+
+    def _peek(self, key: tuple) -> Cell:
+        """Return the view of a cell without caching a new one.
+
+        Args:
+            key (tuple): The position of the cell.
+
+        Returns:
+            Cell: The cached view, a temporary one if there is none, or
+                the cached view with the agent at its location.
+        """
+        if key == self.agent_location:
+            return self[key]
+        return self.cells.get(key) or self._view(key)
 
     def as_float(self) -> np.ndarray:
         """Return the grid as a float.
 
         Returns:
-            np.ndarray: The grid as a float.
+            np.ndarray: A copy of the observation buffer.
         """
-        return np.array(
-            [[cell.to_float() for cell in row] for row in self.grid],
-            dtype=np.float32,
-        )
+        return self._observation.copy()
+
+    def as_codes(self) -> np.ndarray:
+        """Return the grid as uint8 observation codes.
+
+        Returns:
+            np.ndarray: A copy of the code buffer.
+        """
+        return self._codes.copy()
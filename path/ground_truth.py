@@ -1,15 +1,19 @@
 """"Find the ground truth experiences for the generated environment."""
 
+import heapq
+
 import numpy as np
-from beartype import beartype
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
 
 from path import const
+from path.config import checked
 from path.grid import Grid
 
 UNREACHABLE = -9999
 
 
-@beartype
+@checked
 def loc_to_idx(row: int, col: int, cols: int) -> int:
     """Convert a row and column to an index to a flattened array.
 
@@ -70,41 +74,336 @@ def path_to_actions(path, cols: int):
     return actions
 
 
-@beartype
-def adjacency_matrix(grid: Grid) -> np.ndarray:
-    """Return the adjacency matrix of the grid.
+@checked
+def adjacency_matrix(grid: Grid) -> csr_matrix:
+    """Return the sparse adjacency matrix of the grid.
+
+    The edges between orthogonal neighbours are found by shifting the
+    movable mask of the grid by one cell in each direction. The weight of
+    an edge is the cost of moving into its destination cell.
+
+    Args:
+        grid (Grid): The grid.
+
+    Returns:
+        csr_matrix: The adjacency matrix of the grid.
+    """
+    rows, cols = grid.size
+    movable = grid.movable
+    move_cost = grid.move_cost.ravel().astype(np.float64)
+    idx = np.arange(rows * cols).reshape(rows, cols)
+
+    # cells that can move into their neighbour below / to the right
+    vertical = movable[:-1, :] & movable[1:, :]
+    horizontal = movable[:, :-1] & movable[:, 1:]
+    upper, lower = idx[:-1, :][vertical], idx[1:, :][vertical]
+    left, right = idx[:, :-1][horizontal], idx[:, 1:][horizontal]
+
+    # down, up, right, left
+    src = np.concatenate((upper, lower, left, right))
+    dest = np.concatenate((lower, upper, right, left))
+    return csr_matrix(
+        (move_cost[dest], (src, dest)),
+        shape=(rows * cols, rows * cols),
+    )
+
+
+def neighbours(node: int, rows: int, cols: int):
+    """Yield the flat indices of the orthogonal neighbours of a cell.
+
+    Args:
+        node (int): The flat index of the cell.
+        rows (int): The number of rows.
+        cols (int): The number of cols.
+
+    Yields:
+        int: The flat index of a neighbour.
+    """
+    row, col = divmod(node, cols)
+    if row > 0:
+        yield node - cols
+    if row < rows - 1:
+        yield node + cols
+    if col > 0:
+        yield node - 1
+    if col < cols - 1:
+        yield node + 1
+
+
+def _walk(predecessors: dict, start: int, goal: int) -> list:
+    """Walk a predecessors mapping back from the goal to the start.
+
+    Args:
+        predecessors (dict): The predecessor of each reached index.
+        start (int): The start index.
+        goal (int): The goal index.
+
+    Returns:
+        list: The path.
+    """
+    res = [goal]
+    while res[-1] != start:
+        res.append(predecessors[res[-1]])
+    res.reverse()
+    return res
+
+
+def solve_scipy(grid: Grid, start: int, goal: int) -> list:
+    """Find the shortest path with SciPy's Dijkstra over the whole grid.
+
+    This is the reference solver.
+
+    Args:
+        grid (Grid): The grid.
+        start (int): The start index.
+        goal (int): The goal index.
+
+    Returns:
+        list: The path.
+    """
+    _, predecessors = dijkstra(
+        adjacency_matrix(grid),
+        directed=True,
+        indices=start,
+        return_predecessors=True,
+    )
+    return get_path(predecessors, start, goal)
+
+
+def solve_astar(grid: Grid, start: int, goal: int) -> list:
+    """Find the shortest path with A* and a Manhattan distance heuristic.
+
+    The heuristic is scaled by the cheapest move cost on the grid so that
+    it stays admissible. Ties are broken towards the deeper cell, which
+    keeps the search narrow on open maps. The search stops once the goal is
+    expanded.
 
     Args:
         grid (Grid): The grid.
+        start (int): The start index.
+        goal (int): The goal index.
 
     Returns:
-        np.ndarray: The adjacency matrix of the grid.
+        list: The path.
+
+    Raises:
+        ValueError: If the goal is unreachable.
     """
     rows, cols = grid.size
-    matrix = np.zeros((rows*cols, rows*cols))
-    for row in range(0, rows):
-        for col in range(0, cols):
-            if grid[row, col].movable:
-                current_cell_idx = loc_to_idx(row, col, cols)
-                # up
-                if row > 0 and grid[row - 1, col].movable:
-                    cell_idx = loc_to_idx(row - 1, col, cols)
-                    cost = grid[row - 1, col].move_cost
-                    matrix[current_cell_idx, cell_idx] = cost
-                # down
-                if row < rows and grid[row + 1, col].movable:
-                    cell_idx = loc_to_idx(row + 1, col, cols)
-                    cost = grid[row + 1, col].move_cost
-                    matrix[current_cell_idx, cell_idx] = cost
-                # left
-                if col > 0 and grid[row, col - 1].movable:
-                    cell_idx = loc_to_idx(row, col - 1, cols)
-                    cost = grid[row, col - 1].move_cost
-                    matrix[current_cell_idx, cell_idx] = cost
-                # right
-                if col < cols and grid[row, col + 1].movable:
-                    cell_idx = loc_to_idx(row, col + 1, cols)
-                    cost = grid[row, col + 1].move_cost
-                    matrix[current_cell_idx, cell_idx] = cost
-
-    return matrix
+    movable = grid.movable.ravel().tolist()
+    cost = grid.cost.ravel().tolist()
+    min_cost = float(grid.cost[grid.movable].min())
+    goal_row, goal_col = divmod(goal, cols)
+
+    def heuristic(node):
+        row, col = divmod(node, cols)
+        return min_cost * (abs(row - goal_row) + abs(col - goal_col))
+
+    distances = {start: 0.0}
+    predecessors = {start: start}
+    queue = [(heuristic(start), 0.0, start)]
+    while queue:
+        _, neg_dist, node = heapq.heappop(queue)
+        dist = -neg_dist
+        if node == goal:
+            return _walk(predecessors, start, goal)
+        if dist > distances[node]:
+            continue
+        for nbr in neighbours(node, rows, cols):
+            if not movable[nbr]:
+                continue
+            new_dist = dist + cost[nbr]
+            if new_dist < distances.get(nbr, np.inf):
+                distances[nbr] = new_dist
+                predecessors[nbr] = node
+                heapq.heappush(
+                    queue, (new_dist + heuristic(nbr), -new_dist, nbr),
+                )
+    raise ValueError('No path to goal.')
+
+
+def solve_dial(grid: Grid, start: int, goal: int) -> list:
+    """Find the shortest path with Dial's bucket queue Dijkstra.
+
+    Requires integer move costs. Buckets are reused circularly, so only
+    max cost + 1 of them are needed. The search stops once the goal is
+    expanded.
+
+    Args:
+        grid (Grid): The grid.
+        start (int): The start index.
+        goal (int): The goal index.
+
+    Returns:
+        list: The path.
+
+    Raises:
+        ValueError: If the move costs are not integers, or if the goal
+            is unreachable.
+    """
+    rows, cols = grid.size
+    costs = grid.cost[grid.movable]
+    if not np.array_equal(costs, np.rint(costs)) or costs.min() < 0:
+        raise ValueError('Dial solver requires non-negative integer costs.')
+    movable = grid.movable.ravel().tolist()
+    cost = grid.cost.ravel().astype(np.int64).tolist()
+
+    n_buckets = int(costs.max()) + 1
+    buckets = [[] for _ in range(n_buckets)]
+    buckets[0].append(start)
+    pending = 1
+    distances = {start: 0}
+    predecessors = {start: start}
+    dist = 0
+    while pending:
+        bucket = buckets[dist % n_buckets]
+        while bucket:
+            node = bucket.pop()
+            pending -= 1
+            # skip stale entries that were improved after being queued
+            if distances[node] != dist:
+                continue
+            if node == goal:
+                return _walk(predecessors, start, goal)
+            for nbr in neighbours(node, rows, cols):
+                if not movable[nbr]:
+                    continue
+                new_dist = dist + cost[nbr]
+                if new_dist < distances.get(nbr, new_dist + 1):
+                    distances[nbr] = new_dist
+                    predecessors[nbr] = node
+                    buckets[new_dist % n_buckets].append(nbr)
+                    pending += 1
+        dist += 1
+    raise ValueError('No path to goal.')
+
+
+@checked
+def distance_field(grid: Grid, goal: int) -> tuple:
+    """Return the distance to the goal and the next step from every cell.
+
+    Runs a single Dijkstra from the goal over the reversed graph, so that
+    the path from any start cell becomes a walk over the successors.
+
+    Args:
+        grid (Grid): The grid.
+        goal (int): The goal index.
+
+    Returns:
+        np.ndarray: The distance from each cell to the goal, inf if
+            unreachable.
+        np.ndarray: The next cell on the path from each cell to the goal,
+            UNREACHABLE for the goal and unreachable cells.
+    """
+    distances, successors = dijkstra(
+        adjacency_matrix(grid).transpose().tocsr(),
+        directed=True,
+        indices=goal,
+        return_predecessors=True,
+    )
+    return distances, successors
+
+
+def field_path(successors: np.ndarray, start: int, goal: int) -> list:
+    """Get the path from the start to the goal from a successors array.
+
+    Args:
+        successors (np.ndarray): The successors array of distance_field().
+        start (int): The start index.
+        goal (int): The goal index.
+
+    Returns:
+        list: The path.
+
+    Raises:
+        ValueError: If the goal is unreachable.
+    """
+    res = [start]
+    current = start
+    while current != goal:
+        current = successors[current]
+        if current == UNREACHABLE:
+            raise ValueError('No path to goal.')
+        res.append(int(current))
+    return res
+
+
+def field_paths(successors: np.ndarray, starts, goal: int) -> tuple:
+    """Get the paths from many starts to the goal from a successors array.
+
+    All starts are walked at once, one step of every path per iteration,
+    so the loop runs as many times as the longest path has steps.
+
+    Args:
+        successors (np.ndarray): The successors array of distance_field().
+        starts: The start indices.
+        goal (int): The goal index.
+
+    Returns:
+        np.ndarray: The paths, one row per start, padded with the goal
+            after it is reached.
+        np.ndarray: The number of steps of each path.
+
+    Raises:
+        ValueError: If the goal is unreachable from a start.
+    """
+    current = np.asarray(starts, dtype=np.int64)
+    stuck = (successors[current] == UNREACHABLE) & (current != goal)
+    if stuck.any():
+        raise ValueError(
+            'No path to goal from {}.'.format(current[stuck].tolist()),
+        )
+    res = [current]
+    active = current != goal
+    while active.any():
+        current = np.where(active, successors[current], goal)
+        res.append(current)
+        active = current != goal
+    paths = np.stack(res, axis=1)
+    return paths, (paths != goal).sum(axis=1)
+
+
+def paths_to_actions(paths: np.ndarray, cols: int) -> np.ndarray:
+    """Convert padded paths to actions.
+
+    Args:
+        paths (np.ndarray): The paths of field_paths().
+        cols (int): The number of columns of the grid.
+
+    Returns:
+        np.ndarray: The actions of each path, -1 after the goal.
+    """
+    diffs = np.diff(paths, axis=1)
+    res = np.full(diffs.shape, -1, dtype=np.int64)
+    for action, (row_delta, col_delta) in enumerate(const.ACTION_DELTAS):
+        res[diffs == row_delta * cols + col_delta] = action
+    return res
+
+
+SOLVERS = {
+    'scipy': solve_scipy,
+    'astar': solve_astar,
+    'dial': solve_dial,
+}
+
+
+def shortest_path(
+    grid: Grid, start: int, goal: int, solver: str = 'scipy',
+) -> list:
+    """Find the shortest path between two cells of the grid.
+
+    Args:
+        grid (Grid): The grid.
+        start (int): The start index.
+        goal (int): The goal index.
+        solver (str): The solver backend, one of SOLVERS.
+
+    Returns:
+        list: The path as a list of flat indices.
+
+    Raises:
+        ValueError: If the solver is unknown.
+    """
+    if solver not in SOLVERS:
+        raise ValueError('Unknown solver {}'.format(solver))
+    return SOLVERS[solver](grid, start, goal)
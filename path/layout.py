@@ -0,0 +1,155 @@
+"""Vectorized generation of reachable grid layouts."""
+
+import numpy as np
+from scipy import ndimage
+
+from path import const
+
+
+class Layout(object):
+    """Static structure of a grid, plus the goal and agent start."""
+
+    def __init__(
+        self,
+        obstacle: np.ndarray,
+        cost: np.ndarray,
+        goal: tuple,
+        start: tuple,
+    ):
+        """Initialize the layout.
+
+        Args:
+            obstacle (np.ndarray): The obstacle mask.
+            cost (np.ndarray): The cost of moving into each cell.
+            goal (tuple): The row and column of the goal.
+            start (tuple): The row and column of the agent start.
+        """
+        self.obstacle = obstacle
+        self.cost = cost
+        self.goal = goal
+        self.start = start
+
+    @property
+    def size(self) -> tuple:
+        """Return the size of the layout.
+
+        Returns:
+            tuple: The number of rows and cols.
+        """
+        return self.obstacle.shape
+
+
+def border_mask(size: tuple) -> np.ndarray:
+    """Return a mask of the cells on the edge of a grid.
+
+    Args:
+        size (tuple): The size of the grid.
+
+    Returns:
+        np.ndarray: True on the edge of the grid.
+    """
+    mask = np.ones(size, dtype=bool)
+    mask[1:-1, 1:-1] = False
+    return mask
+
+
+def reachable_mask(obstacle: np.ndarray, goal: tuple) -> np.ndarray:
+    """Return the cells from which the goal can be reached.
+
+    Uses a single connected components labeling of the movable cells.
+
+    Args:
+        obstacle (np.ndarray): The obstacle mask.
+        goal (tuple): The row and column of the goal.
+
+    Returns:
+        np.ndarray: True where a path to the goal exists.
+    """
+    labels, _ = ndimage.label(~obstacle)
+    if labels[goal] == 0:
+        return np.zeros(obstacle.shape, dtype=bool)
+    return labels == labels[goal]
+
+
+def generate_layout(
+    size: tuple,
+    obstacles: int = 0,
+    traps: int = 0,
+    trap_cost: float = 2,
+    goal: tuple | None = None,
+    border: bool = True,
+    generator=None,
+    rng=None,
+    max_tries: int = 100,
+) -> Layout:
+    """Generate a layout whose agent start can always reach the goal.
+
+    The map of the generator, if any, is drawn first. Obstacles and traps
+    are then drawn at once from the free cells, and the start is drawn from
+    the free cells connected to the goal, so only layouts where the goal is
+    walled in need to be drawn again.
+
+    Args:
+        size (tuple): The size of the grid.
+        obstacles (int): The number of random obstacles.
+        traps (int): The number of random traps.
+        trap_cost (float): The cost of moving into a trap.
+        goal (tuple | None): The goal, a random free cell if None.
+        border (bool): Whether to surround the grid with obstacles.
+        generator: A map generator of path.maps, no map if None.
+        rng: The numpy random generator, the global one if None.
+        max_tries (int): The number of layouts to draw before giving up.
+
+    Returns:
+        Layout: The layout.
+
+    Raises:
+        ValueError: If the grid without a map is too small for the
+            obstacles, traps, goal and start, or if no reachable layout
+            was drawn in max_tries.
+    """
+    if rng is None:
+        rng = np.random
+    base = border_mask(size) if border else np.zeros(size, dtype=bool)
+    cols = size[1]
+    # free cells needed besides the goal, which may lie on the border
+    needed = obstacles + traps + 1
+    if goal is None or not base[goal]:
+        needed += 1
+    if np.count_nonzero(~base) < needed:
+        raise ValueError('Grid of size {} is too small'.format(size))
+
+    for _ in range(max_tries):
+        if generator is None:
+            obstacle = base.copy()
+            cost = np.full(size, const.DEFAULT_COST, dtype=np.float32)
+        else:
+            obstacle, cost = generator(size, rng)
+            obstacle = obstacle | base
+        free = np.flatnonzero(~obstacle)
+        if goal is None:
+            goal_loc = divmod(int(rng.choice(free)), cols)
+        else:
+            goal_loc = goal
+            obstacle[goal_loc] = False
+        cost[goal_loc] = const.DEFAULT_COST
+        free = free[cost.flat[free] == const.DEFAULT_COST]
+        free = free[free != goal_loc[0] * cols + goal_loc[1]]
+        if len(free) < obstacles + traps + 1:
+            # the map left too few free cells, draw another one
+            continue
+
+        picks = rng.choice(free, obstacles + traps, replace=False)
+        obstacle.flat[picks[:obstacles]] = True
+        cost.flat[picks[obstacles:]] = trap_cost
+
+        starts = reachable_mask(obstacle, goal_loc)
+        starts[goal_loc] = False
+        starts &= cost == const.DEFAULT_COST
+        candidates = np.flatnonzero(starts)
+        if len(candidates):
+            start = divmod(int(rng.choice(candidates)), cols)
+            return Layout(obstacle, cost, goal_loc, start)
+    raise ValueError(
+        'No reachable layout found in {} tries'.format(max_tries),
+    )
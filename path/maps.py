@@ -0,0 +1,168 @@
+"""Procedural map generators.
+
+A generator takes the size of the grid and a numpy random generator, and
+returns the obstacle mask and the cost layer of a map in one shot. Only
+``rng.random()`` is used, so both ``np.random.Generator`` and the global
+``np.random`` state work, and a map can be regenerated exactly from the
+seed of its generator with generate_map().
+"""
+
+import numpy as np
+from scipy import ndimage
+
+from path import const
+
+# neighbourhood of the cellular automaton, the cell included
+_MOORE = np.ones((3, 3), dtype=np.uint8)
+
+
+def open_map(size: tuple, rng) -> tuple:
+    """Generate a map without obstacles or traps.
+
+    Args:
+        size (tuple): The size of the grid.
+        rng: The numpy random generator.
+
+    Returns:
+        np.ndarray: The obstacle mask.
+        np.ndarray: The cost of moving into each cell.
+    """
+    return (
+        np.zeros(size, dtype=bool),
+        np.full(size, const.DEFAULT_COST, dtype=np.float32),
+    )
+
+
+def blobs(size: tuple, rng, density: float = 0.45, steps: int = 4) -> tuple:
+    """Generate blob obstacles of random sizes with a cellular automaton.
+
+    Starts from random noise and repeatedly turns a cell into an obstacle
+    when at least 5 cells of its 3x3 neighbourhood are obstacles.
+
+    Args:
+        size (tuple): The size of the grid.
+        rng: The numpy random generator.
+        density (float): The initial fraction of obstacles.
+        steps (int): The number of automaton steps.
+
+    Returns:
+        np.ndarray: The obstacle mask.
+        np.ndarray: The cost of moving into each cell.
+    """
+    obstacle = rng.random(size) < density
+    for _ in range(steps):
+        walls = ndimage.convolve(
+            obstacle.astype(np.uint8), _MOORE, mode='constant', cval=0,
+        )
+        obstacle = walls >= 5
+    return obstacle, np.full(size, const.DEFAULT_COST, dtype=np.float32)
+
+
+def trap_field(
+    size: tuple,
+    rng,
+    density: float = 0.15,
+    cost: float = 2,
+    sigma: float = 2,
+) -> tuple:
+    """Generate patches of traps by thresholding smoothed noise.
+
+    Args:
+        size (tuple): The size of the grid.
+        rng: The numpy random generator.
+        density (float): The fraction of cells that are traps.
+        cost (float): The cost of moving into a trap.
+        sigma (float): The smoothing of the noise, larger gives bigger
+            patches.
+
+    Returns:
+        np.ndarray: The obstacle mask.
+        np.ndarray: The cost of moving into each cell.
+    """
+    noise = ndimage.gaussian_filter(rng.random(size), sigma)
+    traps = noise > np.quantile(noise, 1 - density)
+    return (
+        np.zeros(size, dtype=bool),
+        np.where(traps, cost, const.DEFAULT_COST).astype(np.float32),
+    )
+
+
+def blobs_and_traps(size: tuple, rng) -> tuple:
+    """Generate blob obstacles over a field of traps.
+
+    Args:
+        size (tuple): The size of the grid.
+        rng: The numpy random generator.
+
+    Returns:
+        np.ndarray: The obstacle mask.
+        np.ndarray: The cost of moving into each cell.
+    """
+    obstacle, _ = blobs(size, rng)
+    _, cost = trap_field(size, rng)
+    return obstacle, cost
+
+
+def maze(size: tuple, rng) -> tuple:
+    """Generate a perfect maze with the binary tree algorithm.
+
+    Maze cells lie on a lattice of every other row and column, anchored at
+    (rows - 2, cols - 2) so that the default goal is always a maze cell.
+    Every cell carves a passage either up or left, which connects all cells
+    without loops.
+
+    Args:
+        size (tuple): The size of the grid.
+        rng: The numpy random generator.
+
+    Returns:
+        np.ndarray: The obstacle mask.
+        np.ndarray: The cost of moving into each cell.
+    """
+    rows, cols = size
+    cell_rows = np.arange(rows - 2, 0, -2)[::-1]
+    cell_cols = np.arange(cols - 2, 0, -2)[::-1]
+    grid_rows, grid_cols = np.meshgrid(cell_rows, cell_cols, indexing='ij')
+
+    obstacle = np.ones(size, dtype=bool)
+    obstacle[grid_rows, grid_cols] = False
+
+    # the top row of cells can only carve left, the left column only up
+    up = rng.random(grid_rows.shape) < 0.5
+    up[0, :] = False
+    up[:, 0] = True
+    left = ~up
+    up[0, 0] = False
+    left[0, 0] = False
+    obstacle[grid_rows[up] - 1, grid_cols[up]] = False
+    obstacle[grid_rows[left], grid_cols[left] - 1] = False
+    return obstacle, np.full(size, const.DEFAULT_COST, dtype=np.float32)
+
+
+MAP_GENERATORS = {
+    'open': open_map,
+    'blobs': blobs,
+    'traps': trap_field,
+    'blobs_traps': blobs_and_traps,
+    'maze': maze,
+}
+
+
+def generate_map(generator: str, size: tuple, seed: int) -> tuple:
+    """Generate the map of a named generator for a seed.
+
+    Args:
+        generator (str): The name of the generator, one of MAP_GENERATORS.
+        size (tuple): The size of the grid.
+        seed (int): The seed of the map.
+
+    Returns:
+        np.ndarray: The obstacle mask.
+        np.ndarray: The cost of moving into each cell.
+
+    Raises:
+        ValueError: If the generator is unknown.
+    """
+    if generator not in MAP_GENERATORS:
+        raise ValueError('Unknown generator {}'.format(generator))
+    return MAP_GENERATORS[generator](size, np.random.default_rng(seed))
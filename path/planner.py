@@ -0,0 +1,316 @@
+"""Incremental shortest paths on changing grids with D* Lite."""
+
+import heapq
+import math
+
+import numpy as np
+
+from path.grid import Grid
+from path.ground_truth import neighbours, path_to_actions
+
+
+class IncrementalPlanner(object):
+    """D* Lite planner bound to a grid.
+
+    The search runs from the goal towards the agent and keeps the distance
+    to the goal of every cell it expanded. The planner is a listener of the
+    grid: when the obstacle or cost of a cell changes, only that cell and
+    its neighbours are marked inconsistent, and the next query repairs the
+    distances that depend on them. Agent moves only shift the heuristic,
+    through the key modifier of D* Lite, so following the path needs no new
+    search. Moving the goal or loading a layout restarts the search.
+    """
+
+    def __init__(self, grid: Grid):
+        """Initialize the planner and register it as a listener of the grid.
+
+        Args:
+            grid (Grid): The grid, with a goal.
+        """
+        self.grid = grid
+        self.rows, self.cols = grid.size
+        self.goal = None
+        self.min_cost = None
+        # number of cells expanded by all searches
+        self.expanded = 0
+        self._stale = True
+        grid.listeners.append(self.update)
+
+    def detach(self):
+        """Stop listening to the grid."""
+        self.grid.listeners.remove(self.update)
+
+    def update(self, loc: tuple | None):
+        """Record a change of a cell of the grid.
+
+        Args:
+            loc (tuple | None): The changed cell, None if the whole grid
+                changed.
+        """
+        if loc is None:
+            self._stale = True
+        if self._stale:
+            return
+        node = loc[0] * self.cols + loc[1]
+        if bool(self.grid.goal[loc]) != (node == self.goal):
+            self._stale = True
+            return
+
+        movable = not self.grid.obstacle[loc]
+        cost = float(self.grid.cost[loc])
+        if movable == self._movable[node] and cost == self._cost[node]:
+            return
+        if movable and cost < self.min_cost:
+            # the heuristic would no longer be admissible
+            self._stale = True
+            return
+        self._movable[node] = movable
+        self._cost[node] = cost
+        self._update_vertex(node)
+        for nbr in neighbours(node, self.rows, self.cols):
+            self._update_vertex(nbr)
+
+    def path(self, start: tuple | None = None) -> list:
+        """Return a shortest path to the goal.
+
+        Args:
+            start (tuple | None): The (row, col) of the start, the agent if
+                None.
+
+        Returns:
+            list: The path as a list of flat indices.
+
+        Raises:
+            ValueError: If the goal is unreachable.
+        """
+        node = self._plan(start)
+        if self._g[node] == math.inf:
+            raise ValueError('No path to goal.')
+        res = [node]
+        while node != self.goal:
+            node = self._best_successor(node)
+            res.append(node)
+        return res
+
+    def next_action(self, start: tuple | None = None) -> int:
+        """Return the first action of a shortest path.
+
+        Args:
+            start (tuple | None): The (row, col) of the start, the agent if
+                None.
+
+        Returns:
+            int: The action.
+
+        Raises:
+            ValueError: If the start is the goal or can not reach it.
+        """
+        node = self._plan(start)
+        if node == self.goal or self._g[node] == math.inf:
+            raise ValueError('No action to goal.')
+        nxt = self._best_successor(node)
+        return path_to_actions([node, nxt], self.cols)[0]
+
+    def distance(self, start: tuple | None = None) -> float:
+        """Return the cost of a shortest path to the goal.
+
+        Args:
+            start (tuple | None): The (row, col) of the start, the agent if
+                None.
+
+        Returns:
+            float: The cost, inf if the goal is unreachable.
+        """
+        node = self._plan(start)
+        return self._g[node]
+
+    def _plan(self, start: tuple | None) -> int:
+        """Bring the distances of the start up to date.
+
+        Args:
+            start (tuple | None): The (row, col) of the start, the agent if
+                None.
+
+        Returns:
+            int: The flat index of the start.
+
+        Raises:
+            ValueError: If no start is given and no agent is placed.
+        """
+        if start is None:
+            if self.grid.agent_row < 0:
+                raise ValueError('No agent on the grid')
+            start = self.grid.agent_location
+        node = start[0] * self.cols + start[1]
+        if self._stale:
+            self._reset(node)
+        elif node != self._last:
+            self._km += self._heuristic(self._last, node)
+            self._last = node
+        self._search(node)
+        return node
+
+    def _reset(self, start: int):
+        """Restart the search from the current layers of the grid.
+
+        Args:
+            start (int): The flat index of the start.
+
+        Raises:
+            ValueError: If the grid has no goal.
+        """
+        goals = np.flatnonzero(self.grid.goal)
+        if not len(goals):
+            raise ValueError('No goal on the grid')
+        movable = ~self.grid.obstacle
+        self.goal = int(goals[0])
+        self.min_cost = float(self.grid.cost[movable].min())
+        self._movable = movable.ravel().tolist()
+        self._cost = self.grid.cost.ravel().tolist()
+        size = self.rows * self.cols
+        self._g = [math.inf] * size
+        self._rhs = [math.inf] * size
+        self._rhs[self.goal] = 0.0
+        self._km = 0.0
+        self._last = start
+        # current key of each inconsistent cell, the heap may hold stale
+        # entries of cells that were updated since
+        self._open = {}
+        self._queue = []
+        self._stale = False
+        self._push(self.goal, start)
+
+    def _search(self, start: int):
+        """Expand cells until the start and its shortest path are consistent.
+
+        Args:
+            start (int): The flat index of the start.
+        """
+        g = self._g
+        rhs = self._rhs
+        queue = self._queue
+        while True:
+            top = self._top()
+            start_key = self._key(start, start)
+            # cells with a key equal to the start can lie on its path
+            if top is None or (top[0] > start_key and rhs[start] == g[start]):
+                return
+            key, node = heapq.heappop(queue)
+            new_key = self._key(node, start)
+            if key < new_key:
+                self._open[node] = new_key
+                heapq.heappush(queue, (new_key, node))
+                continue
+            del self._open[node]
+            self.expanded += 1
+            if g[node] > rhs[node]:
+                g[node] = rhs[node]
+            else:
+                g[node] = math.inf
+                self._update_vertex(node, start)
+            for nbr in neighbours(node, self.rows, self.cols):
+                self._update_vertex(nbr, start)
+
+    def _update_vertex(self, node: int, start: int | None = None):
+        """Recompute the lookahead distance of a cell and queue it.
+
+        Args:
+            node (int): The flat index of the cell.
+            start (int | None): The flat index of the start, the last start
+                if None.
+        """
+        if node != self.goal:
+            self._rhs[node] = self._lookahead(node)
+        if self._g[node] != self._rhs[node]:
+            self._push(node, self._last if start is None else start)
+        else:
+            self._open.pop(node, None)
+
+    def _lookahead(self, node: int) -> float:
+        """Return the distance of a cell through its best successor.
+
+        Args:
+            node (int): The flat index of the cell.
+
+        Returns:
+            float: The distance, inf for obstacles.
+        """
+        if not self._movable[node]:
+            return math.inf
+        res = math.inf
+        for nbr in neighbours(node, self.rows, self.cols):
+            if self._movable[nbr]:
+                res = min(res, self._cost[nbr] + self._g[nbr])
+        return res
+
+    def _best_successor(self, node: int) -> int:
+        """Return the neighbour on a shortest path from a cell.
+
+        Args:
+            node (int): The flat index of the cell.
+
+        Returns:
+            int: The flat index of the neighbour.
+        """
+        res = None
+        best = math.inf
+        for nbr in neighbours(node, self.rows, self.cols):
+            if self._movable[nbr] and self._cost[nbr] + self._g[nbr] < best:
+                best = self._cost[nbr] + self._g[nbr]
+                res = nbr
+        return res
+
+    def _push(self, node: int, start: int):
+        """Queue a cell with its current key.
+
+        Args:
+            node (int): The flat index of the cell.
+            start (int): The flat index of the start.
+        """
+        key = self._key(node, start)
+        self._open[node] = key
+        heapq.heappush(self._queue, (key, node))
+
+    def _top(self) -> tuple | None:
+        """Return the queue entry with the smallest key, dropping stale ones.
+
+        Returns:
+            tuple | None: The key and cell, None if the queue is empty.
+        """
+        queue = self._queue
+        while queue:
+            key, node = queue[0]
+            if self._open.get(node) == key:
+                return queue[0]
+            heapq.heappop(queue)
+        return None
+
+    def _key(self, node: int, start: int) -> tuple:
+        """Return the priority of a cell.
+
+        Args:
+            node (int): The flat index of the cell.
+            start (int): The flat index of the start.
+
+        Returns:
+            tuple: The estimated cost of a path from the start through the
+                cell, and the distance of the cell.
+        """
+        dist = min(self._g[node], self._rhs[node])
+        return (dist + self._heuristic(start, node) + self._km, dist)
+
+    def _heuristic(self, first: int, second: int) -> float:
+        """Return a lower bound of the distance between two cells.
+
+        Args:
+            first (int): The flat index of a cell.
+            second (int): The flat index of the other cell.
+
+        Returns:
+            float: The Manhattan distance scaled by the cheapest move cost.
+        """
+        first_row, first_col = divmod(first, self.cols)
+        second_row, second_col = divmod(second, self.cols)
+        return self.min_cost * (
+            abs(first_row - second_row) + abs(first_col - second_col)
+        )
@@ -0,0 +1,87 @@
+"""Bounded cache of generated layouts."""
+
+from collections import OrderedDict
+
+
+class LayoutPool(object):
+    """Least recently used cache of layouts and their derived data.
+
+    Entries are opaque to the pool; Environment stores the obstacle and
+    cost layers of a layout together with its distance field, keyed by
+    the layout seed.
+    """
+
+    def __init__(self, capacity: int):
+        """Initialize the pool.
+
+        Args:
+            capacity (int): The maximum number of layouts kept.
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: int):
+        """Return the entry of a layout and mark it as recently used.
+
+        Args:
+            key (int): The key of the layout.
+
+        Returns:
+            The entry, or None if the layout is not in the pool.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: int, entry):
+        """Add the entry of a layout, evicting the least recently used.
+
+        Args:
+            key (int): The key of the layout.
+            entry: The entry of the layout.
+        """
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Return the counters of the pool.
+
+        Returns:
+            dict: The size, capacity, hits, misses and evictions.
+        """
+        return {
+            'size': len(self._entries),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def __len__(self) -> int:
+        """Return the number of layouts in the pool.
+
+        Returns:
+            int: The number of layouts.
+        """
+        return len(self._entries)
+
+    def __contains__(self, key: int) -> bool:
+        """Return if a layout is in the pool, without counting a lookup.
+
+        Args:
+            key (int): The key of the layout.
+
+        Returns:
+            bool: True if the layout is in the pool.
+        """
+        return key in self._entries
@@ -0,0 +1,83 @@
+"""Background preparation of episodes."""
+
+import queue
+import threading
+
+
+class Prefetcher(object):
+    """Thread that keeps a bounded queue of items filled.
+
+    The items are produced by calling a function in a single background
+    thread, so they are produced in the same order as inline calls would
+    be. The thread blocks while the queue is full.
+    """
+
+    def __init__(self, produce, capacity: int):
+        """Initialize the prefetcher and start its thread.
+
+        Args:
+            produce: The function producing an item, called without
+                arguments.
+            capacity (int): The maximum number of items waiting.
+        """
+        self.produce = produce
+        self.capacity = capacity
+        self._queue = queue.Queue(maxsize=capacity)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def get(self):
+        """Return the next item, waiting for it if needed.
+
+        Returns:
+            The item.
+
+        Raises:
+            RuntimeError: If the prefetcher is closed.
+            Exception: The exception raised by the produce function.
+        """
+        if self._stop.is_set():
+            raise RuntimeError('Prefetcher is closed')
+        item, error = self._queue.get()
+        if error is not None:
+            self.close()
+            raise error
+        return item
+
+    def close(self):
+        """Stop the thread and drop the waiting items."""
+        self._stop.set()
+        while self._thread.is_alive():
+            # unblock a put on a full queue
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._thread.join(timeout=0.01)
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    def __len__(self) -> int:
+        """Return the number of items waiting.
+
+        Returns:
+            int: The number of items.
+        """
+        return self._queue.qsize()
+
+    def _run(self):
+        """Produce items until stopped or until produce raises."""
+        while not self._stop.is_set():
+            try:
+                entry = (self.produce(), None)
+            except Exception as error:
+                entry = (None, error)
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(entry, timeout=0.1)
+                except queue.Full:
+                    continue
+                break
+            if entry[1] is not None:
+                return
@@ -0,0 +1,103 @@
+"""Phase timers and counters for instrumenting the environment."""
+
+from collections import defaultdict
+from contextlib import nullcontext
+from time import perf_counter
+
+# shared context of phases that are not timed
+NO_PHASE = nullcontext()
+
+
+class Phase(object):
+    """Context that times one run of a phase."""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name: str):
+        """Initialize the phase.
+
+        Args:
+            profiler (Profiler): The profiler to record the time to.
+            name (str): The name of the phase.
+        """
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        """Start the timer."""
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        """Stop the timer and record the elapsed time.
+
+        Args:
+            exc_info: The exception raised in the phase, if any.
+        """
+        self.profiler.record(self.name, perf_counter() - self.start)
+
+
+class Profiler(object):
+    """Accumulates the time spent in named phases and named counters."""
+
+    def __init__(self):
+        """Initialize the profiler."""
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.last = {}
+
+    def phase(self, name: str) -> Phase:
+        """Return a context that times a phase.
+
+        Args:
+            name (str): The name of the phase.
+
+        Returns:
+            Phase: The context.
+        """
+        return Phase(self, name)
+
+    def record(self, name: str, elapsed: float):
+        """Record one run of a phase.
+
+        Args:
+            name (str): The name of the phase.
+            elapsed (float): The time of the run in seconds.
+        """
+        self.totals[name] += elapsed
+        self.calls[name] += 1
+        self.last[name] = elapsed
+
+    def count(self, name: str, increment: int = 1):
+        """Increment a counter.
+
+        Args:
+            name (str): The name of the counter.
+            increment (int): The amount to add.
+        """
+        self.counters[name] += increment
+
+    def stats(self) -> dict:
+        """Return the aggregate timings and counters.
+
+        Returns:
+            dict: For each phase the number of calls and the total and mean
+                time in seconds, and the counters.
+        """
+        phases = {}
+        for name, total in self.totals.items():
+            calls = self.calls[name]
+            phases[name] = {
+                'calls': calls,
+                'total': total,
+                'mean': total / calls,
+            }
+        return {'phases': phases, 'counters': dict(self.counters)}
+
+    def clear(self):
+        """Reset all timings and counters."""
+        self.totals.clear()
+        self.calls.clear()
+        self.counters.clear()
+        self.last.clear()
@@ -0,0 +1,203 @@
+"""Multi-resolution observations of large grids.
+
+A pyramid observation is a window of cells around the agent, plus max and
+mean pooled summaries of the whole grid at fixed sizes. Pooling uses
+blocks of nearly equal size, so the summaries do not depend on the size of
+the grid.
+"""
+
+import numpy as np
+
+from path.grid import Grid
+
+
+def block_edges(length: int, size: int) -> np.ndarray:
+    """Return the edges of size nearly equal blocks along an axis.
+
+    Args:
+        length (int): The length of the axis.
+        size (int): The number of blocks.
+
+    Returns:
+        np.ndarray: The size + 1 edges of the blocks.
+
+    Raises:
+        ValueError: If the axis is shorter than the number of blocks.
+    """
+    if length < size:
+        raise ValueError('Can not pool {} cells to {}'.format(length, size))
+    return np.linspace(0, length, size + 1).round().astype(np.int64)
+
+
+def pool(values: np.ndarray, edges: tuple, ufunc) -> np.ndarray:
+    """Reduce the blocks of a 2D array.
+
+    Args:
+        values (np.ndarray): The array.
+        edges (tuple): The block edges of the rows and cols.
+        ufunc: The reducing numpy ufunc, e.g. np.maximum or np.add.
+
+    Returns:
+        np.ndarray: One reduced value per block.
+    """
+    res = ufunc.reduceat(values, edges[0][:-1], axis=0)
+    return ufunc.reduceat(res, edges[1][:-1], axis=1)
+
+
+class Pooling(object):
+    """Block layout of the summaries of one output size."""
+
+    def __init__(self, shape: tuple, size: int):
+        """Initialize the pooling.
+
+        Args:
+            shape (tuple): The shape of the grid.
+            size (int): The number of blocks along each axis.
+        """
+        self.size = size
+        self.edges = (block_edges(shape[0], size), block_edges(shape[1], size))
+        # block of every row and col of the grid
+        self.block_rows = np.repeat(np.arange(size), np.diff(self.edges[0]))
+        self.block_cols = np.repeat(np.arange(size), np.diff(self.edges[1]))
+        self.areas = np.outer(np.diff(self.edges[0]), np.diff(self.edges[1]))
+
+    def block(self, values: np.ndarray, row: int, col: int) -> np.ndarray:
+        """Return the block of a 2D array that contains a cell.
+
+        Args:
+            values (np.ndarray): The array.
+            row (int): The row of the cell.
+            col (int): The col of the cell.
+
+        Returns:
+            np.ndarray: A view of the block.
+        """
+        block_row = self.block_rows[row]
+        block_col = self.block_cols[col]
+        return values[
+            self.edges[0][block_row]:self.edges[0][block_row + 1],
+            self.edges[1][block_col]:self.edges[1][block_col + 1],
+        ]
+
+
+class Pyramid(object):
+    """Pyramid observation of a grid, updated as cells change."""
+
+    def __init__(self, grid: Grid, window: int, sizes: tuple):
+        """Initialize the pyramid and register it as a listener of the grid.
+
+        Args:
+            grid (Grid): The grid, padded by at least window // 2.
+            window (int): The odd width of the window around the agent.
+            sizes (tuple): The output sizes of the pooled summaries.
+        """
+        self.grid = grid
+        self.window = window
+        self.poolings = [Pooling(grid.size, size) for size in sizes]
+        self.max = {}
+        self.mean = {}
+        self.update(None)
+        grid.listeners.append(self.update)
+
+    def update(self, loc: tuple | None):
+        """Update the summaries after a cell changed.
+
+        Args:
+            loc (tuple | None): The changed cell, None to pool everything.
+        """
+        values = self.grid.observation
+        for pooling in self.poolings:
+            size = pooling.size
+            if loc is None:
+                self.max[size] = pool(values, pooling.edges, np.maximum)
+                self.mean[size] = (
+                    pool(values.astype(np.float64), pooling.edges, np.add)
+                    / pooling.areas
+                ).astype(np.float32)
+                continue
+            block = pooling.block(values, *loc)
+            block_row = pooling.block_rows[loc[0]]
+            block_col = pooling.block_cols[loc[1]]
+            self.max[size][block_row, block_col] = block.max()
+            self.mean[size][block_row, block_col] = block.mean(
+                dtype=np.float64,
+            )
+
+    def observe(self) -> dict:
+        """Return the pyramid observation.
+
+        The arrays are read-only views of the buffers of the pyramid and the
+        grid, and change as the grid changes.
+
+        Returns:
+            dict: The window and the max and mean summaries.
+        """
+        res = {'window': self.grid.window(self.window)}
+        for pooling in self.poolings:
+            size = pooling.size
+            res['max{0}'.format(size)] = _read_only(self.max[size])
+            res['mean{0}'.format(size)] = _read_only(self.mean[size])
+        return res
+
+
+def trajectory_pyramids(
+    base: np.ndarray,
+    positions: np.ndarray,
+    sizes: tuple,
+    agent: float,
+) -> dict:
+    """Return the pooled summaries of every step of a trajectory.
+
+    Only the cell of the agent differs from the base observation, so each
+    summary is the summary of the base with the block of the agent fixed.
+
+    Args:
+        base (np.ndarray): The observation without the agent.
+        positions (np.ndarray): The (row, col) of the agent at each step.
+        sizes (tuple): The output sizes of the summaries.
+        agent (float): The value of the agent in the observations.
+
+    Returns:
+        dict: The max and mean summaries, of shape (steps, size, size).
+    """
+    steps = np.arange(len(positions))
+    rows, cols = positions[:, 0], positions[:, 1]
+    agent_values = (base[rows, cols].astype(np.float64) + agent).astype(
+        base.dtype,
+    )
+    res = {}
+    for size in sizes:
+        pooling = Pooling(base.shape, size)
+        block_rows = pooling.block_rows[rows]
+        block_cols = pooling.block_cols[cols]
+
+        maxes = pool(base, pooling.edges, np.maximum)
+        sums = pool(base.astype(np.float64), pooling.edges, np.add)
+        max_maps = np.repeat(maxes[np.newaxis], len(steps), axis=0)
+        max_maps[steps, block_rows, block_cols] = np.maximum(
+            maxes[block_rows, block_cols], agent_values,
+        )
+        mean_maps = np.repeat(
+            (sums / pooling.areas)[np.newaxis], len(steps), axis=0,
+        )
+        mean_maps[steps, block_rows, block_cols] = (
+            sums[block_rows, block_cols] + agent
+        ) / pooling.areas[block_rows, block_cols]
+
+        res['max{0}'.format(size)] = max_maps
+        res['mean{0}'.format(size)] = mean_maps.astype(np.float32)
+    return res
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    """Return a read-only view of an array.
+
+    Args:
+        array (np.ndarray): The array.
+
+    Returns:
+        np.ndarray: The view.
+    """
+    view = array.view()
+    view.flags.writeable = False
+    return view
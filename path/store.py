@@ -0,0 +1,200 @@
+"""On-disk store of expert trajectories.
+
+A store is a directory with an ``index.json`` and one subdirectory per
+shard. Each shard holds one ``.npy`` file per array, so it can be memory
+mapped:
+
+- ``states.npy`` (uint8): observations encoded with path.encoding.
+- ``actions.npy`` (int64), ``terminal.npy`` (bool), ``reward.npy``
+  (float32): one entry per step.
+- ``episode_ends.npy`` (int64): the end step of each episode in the shard.
+
+Episodes are never split across shards.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from path.encoding import decode, encode
+
+INDEX_FILE = 'index.json'
+ARRAYS = ('states', 'actions', 'terminal', 'reward')
+
+
+class ExpertWriter(object):
+    """Write expert datasets to a store, shard by shard."""
+
+    def __init__(self, path: str, shard_steps: int = 100000):
+        """Initialize the writer.
+
+        Args:
+            path (str): The directory of the store, created if missing.
+            shard_steps (int): The number of steps after which a shard is
+                written.
+        """
+        self.path = path
+        self.shard_steps = shard_steps
+        self.shards = []
+        self.shape = None
+        self._pending = {name: [] for name in ARRAYS}
+        self._pending_steps = 0
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, dataset: dict):
+        """Add a dataset of whole episodes to the store.
+
+        Args:
+            dataset (dict): The states, actions, terminal and reward arrays,
+                as returned by path.dataset.generate_expert_dataset().
+                States may be floats or already encoded as uint8 codes.
+
+        Raises:
+            ValueError: If the dataset does not end with a terminal step.
+        """
+        if len(dataset['terminal']) and not dataset['terminal'][-1]:
+            raise ValueError('Dataset must end with a terminal step.')
+        self.shape = dataset['states'].shape[1:]
+        states = dataset['states']
+        if states.dtype != np.uint8:
+            states = encode(states)
+        self._pending['states'].append(states)
+        self._pending['actions'].append(
+            np.asarray(dataset['actions'], dtype=np.int64),
+        )
+        self._pending['terminal'].append(
+            np.asarray(dataset['terminal'], dtype=bool),
+        )
+        self._pending['reward'].append(
+            np.asarray(dataset['reward'], dtype=np.float32),
+        )
+        self._pending_steps += len(dataset['terminal'])
+        if self._pending_steps >= self.shard_steps:
+            self.flush()
+
+    def flush(self):
+        """Write the pending episodes as a new shard."""
+        if not self._pending_steps:
+            return
+        name = 'shard_{0:05d}'.format(len(self.shards))
+        shard_path = os.path.join(self.path, name)
+        os.makedirs(shard_path, exist_ok=True)
+
+        arrays = {
+            key: np.concatenate(chunks)
+            for key, chunks in self._pending.items()
+        }
+        arrays['episode_ends'] = np.flatnonzero(arrays['terminal']) + 1
+        for key, array in arrays.items():
+            np.save(os.path.join(shard_path, '{0}.npy'.format(key)), array)
+
+        self.shards.append({
+            'name': name,
+            'steps': self._pending_steps,
+            'episodes': len(arrays['episode_ends']),
+        })
+        self._pending = {key: [] for key in ARRAYS}
+        self._pending_steps = 0
+
+    def close(self):
+        """Write the last shard and the index of the store."""
+        self.flush()
+        index = {
+            'shape': list(self.shape or ()),
+            'shards': self.shards,
+        }
+        with open(os.path.join(self.path, INDEX_FILE), 'w') as index_file:
+            json.dump(index, index_file, indent=2)
+
+    def __enter__(self):
+        """Enter the writer context.
+
+        Returns:
+            ExpertWriter: The writer.
+        """
+        return self
+
+    def __exit__(self, *args):
+        """Close the writer when leaving the context.
+
+        Args:
+            args: The exception information, if any.
+        """
+        self.close()
+
+
+class ExpertStore(object):
+    """Read a store of expert trajectories with memory mapped shards."""
+
+    def __init__(self, path: str):
+        """Initialize the store.
+
+        Args:
+            path (str): The directory of the store.
+        """
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE)) as index_file:
+            index = json.load(index_file)
+        self.shape = tuple(index['shape'])
+        self.shards = index['shards']
+
+    @property
+    def n_steps(self) -> int:
+        """Return the number of steps in the store.
+
+        Returns:
+            int: The number of steps.
+        """
+        return sum(shard['steps'] for shard in self.shards)
+
+    @property
+    def n_episodes(self) -> int:
+        """Return the number of episodes in the store.
+
+        Returns:
+            int: The number of episodes.
+        """
+        return sum(shard['episodes'] for shard in self.shards)
+
+    def shard(self, idx: int) -> dict:
+        """Return the memory mapped arrays of a shard.
+
+        Args:
+            idx (int): The index of the shard.
+
+        Returns:
+            dict: The arrays of the shard, states are still encoded.
+        """
+        shard_path = os.path.join(self.path, self.shards[idx]['name'])
+        return {
+            key: np.load(
+                os.path.join(shard_path, '{0}.npy'.format(key)),
+                mmap_mode='r',
+            )
+            for key in (*ARRAYS, 'episode_ends')
+        }
+
+    def batches(self, episodes: int = 32):
+        """Stream batches of whole episodes, ready for Agent.experience().
+
+        Only the states of the current batch are decoded to floats.
+
+        Args:
+            episodes (int): The number of episodes per batch.
+
+        Yields:
+            dict: The states, actions, terminal and reward of the batch.
+        """
+        for idx in range(len(self.shards)):
+            shard = self.shard(idx)
+            ends = shard['episode_ends']
+            for first in range(0, len(ends), episodes):
+                start = int(ends[first - 1]) if first else 0
+                stop = int(ends[min(first + episodes, len(ends)) - 1])
+                yield {
+                    'states': decode(shard['states'][start:stop]),
+                    'actions': np.array(shard['actions'][start:stop]),
+                    'terminal': np.array(shard['terminal'][start:stop]),
+                    'reward': np.array(shard['reward'][start:stop]),
+                }
@@ -0,0 +1,188 @@
+"""Compact storage for expert trajectories."""
+
+from collections.abc import Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from path import const
+from path.pyramid import trajectory_pyramids
+
+
+class Trajectory(Sequence):
+    """Sequence of experiences stored as a base grid and agent positions.
+
+    The observations of an episode only differ in the location of the
+    agent, so a trajectory keeps the observation without the agent once,
+    and the position of the agent after each step. States are materialized
+    only when an experience is read. With a window, the base observation is
+    padded by window // 2 cells, and states are the windows centered on the
+    agent. With pyramid sizes as well, states are dicts holding the window
+    and the pooled summaries of path.pyramid.
+    """
+
+    def __init__(
+        self,
+        base: np.ndarray,
+        positions: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        dones: np.ndarray,
+        agent: float = const.AGENT_FLOAT,
+        window: int | None = None,
+        pyramid: tuple | None = None,
+    ):
+        """Initialize the trajectory.
+
+        Args:
+            base (np.ndarray): The observation of the grid without the agent.
+            positions (np.ndarray): The (row, col) of the agent after each
+                step, of shape (steps, 2).
+            actions (np.ndarray): The action of each step.
+            rewards (np.ndarray): The reward of each step.
+            dones (np.ndarray): The done flag of each step.
+            agent (float): The value of the agent in the observations,
+                const.AGENT_CODE for uint8 encoded observations.
+            window (int | None): The width of the agent centered window, or
+                None for full observations.
+            pyramid (tuple | None): The output sizes of the pooled
+                summaries of pyramid observations, which require a window.
+        """
+        self.base = base
+        self.positions = positions
+        self.actions = actions
+        self.rewards = rewards
+        self.dones = dones
+        self.agent = agent
+        self.window = window
+        self.pyramid = pyramid
+
+    def state(self, step: int) -> np.ndarray | dict:
+        """Return the observation after a step.
+
+        Args:
+            step (int): The index of the step.
+
+        Returns:
+            np.ndarray | dict: The observation.
+        """
+        if self.pyramid is not None:
+            res = trajectory_pyramids(
+                self._interior(),
+                self.positions[step:step + 1],
+                self.pyramid,
+                self.agent,
+            )
+            res = {key: summary[0] for key, summary in res.items()}
+            res['window'] = self._window(step)
+            return res
+        return self._window(step)
+
+    def _window(self, step: int) -> np.ndarray:
+        """Return the observation without pooled summaries after a step.
+
+        Args:
+            step (int): The index of the step.
+
+        Returns:
+            np.ndarray: The full or window observation.
+        """
+        row, col = self.positions[step]
+        if self.window is None:
+            res = self.base.copy()
+        else:
+            res = self.base[
+                row:row + self.window, col:col + self.window,
+            ].copy()
+            row = col = self.window // 2
+        res[row, col] = float(res[row, col]) + self.agent
+        return res
+
+    def states(self) -> np.ndarray | dict:
+        """Return the observations after every step.
+
+        Returns:
+            np.ndarray | dict: The observations, of shape (steps, rows,
+                cols), or (steps, window, window) with a window. With
+                pyramid sizes, a dict of the stacked windows and summaries.
+        """
+        if self.pyramid is not None:
+            res = trajectory_pyramids(
+                self._interior(), self.positions, self.pyramid, self.agent,
+            )
+            res['window'] = self._windows()
+            return res
+        return self._windows()
+
+    def _interior(self) -> np.ndarray:
+        """Return the base observation without its padding.
+
+        Returns:
+            np.ndarray: A view of the base observation.
+        """
+        if self.window is None:
+            return self.base
+        pad = self.window // 2
+        rows, cols = self.base.shape
+        return self.base[pad:rows - pad, pad:cols - pad]
+
+    def _windows(self) -> np.ndarray:
+        """Return the observations without pooled summaries of every step.
+
+        Returns:
+            np.ndarray: The full or window observations.
+        """
+        steps = np.arange(len(self))
+        rows, cols = self.positions[:, 0], self.positions[:, 1]
+        if self.window is None:
+            res = np.repeat(self.base[np.newaxis], len(self), axis=0)
+        else:
+            res = sliding_window_view(
+                self.base, (self.window, self.window),
+            )[rows, cols]
+            rows = cols = self.window // 2
+        res[steps, rows, cols] = (
+            res[steps, rows, cols].astype(np.float64) + self.agent
+        )
+        return res
+
+    def __len__(self) -> int:
+        """Return the number of steps.
+
+        Returns:
+            int: The number of steps.
+        """
+        return len(self.actions)
+
+    def __getitem__(self, step: int | slice) -> dict:
+        """Return the experience of a step.
+
+        Args:
+            step (int | slice): The index of the step, or a slice of steps.
+
+        Returns:
+            dict | Trajectory: The action, state, reward and done flag of
+                the step, or a Trajectory of the sliced steps sharing the
+                base observation.
+        """
+        if isinstance(step, slice):
+            return Trajectory(
+                base=self.base,
+                positions=self.positions[step],
+                actions=self.actions[step],
+                rewards=self.rewards[step],
+                dones=self.dones[step],
+                agent=self.agent,
+                window=self.window,
+                pyramid=self.pyramid,
+            )
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError('Step {} out of range'.format(step))
+        return {
+            'action': int(self.actions[step]),
+            'state': self.state(step),
+            'reward': int(self.rewards[step]),
+            'done': bool(self.dones[step]),
+        }
@@ -0,0 +1,311 @@
+"""Environments stepped in parallel by local worker processes."""
+
+import multiprocessing
+
+import gym
+import numpy as np
+
+from path.environment import Environment
+
+
+class EnvironmentPool(gym.Env):
+    """N Environment instances split over worker processes.
+
+    Each worker owns a slice of the environments and steps them in turn,
+    so the environments of different workers step in parallel. Like
+    BatchEnvironment, observations are stacked along a first axis of size
+    N, and members that reach their goal, or run out of steps, are reset at
+    the end of step().
+    """
+
+    def __init__(
+        self,
+        n_envs: int,
+        workers: int | None = None,
+        seed: int | None = None,
+        max_episode_steps: int | None = None,
+        **kwargs,
+    ):
+        """Initialize the pool and start the workers.
+
+        Args:
+            n_envs (int): The number of environments.
+            workers (int | None): The number of worker processes, n_envs
+                if None.
+            seed (int | None): The seed the seeds of the environments are
+                drawn from, fresh entropy if None.
+            max_episode_steps (int | None): The number of steps after which
+                an episode is cut short, unlimited if None.
+            kwargs: The other arguments of each Environment.
+
+        Raises:
+            ValueError: If there are more workers than environments.
+        """
+        workers = n_envs if workers is None else workers
+        if workers > n_envs:
+            raise ValueError('More workers than environments')
+        self.n_envs = n_envs
+        self.steps = 0
+        # every environment needs its own seed, forked workers would
+        # otherwise share the global numpy random state
+        seeds = np.random.SeedSequence(seed).generate_state(n_envs).tolist()
+
+        probe = Environment(seed=0, **kwargs)
+        self.action_space = gym.spaces.MultiDiscrete([4] * n_envs)
+        self.observation_space = _batched_space(
+            probe.observation_space, n_envs,
+        )
+        self.reward_range = probe.reward_range
+        probe.close()
+
+        context = multiprocessing.get_context('spawn')
+        self._bounds = np.linspace(0, n_envs, workers + 1).astype(int)
+        self._conns = []
+        self._processes = []
+        for start, end in zip(self._bounds[:-1], self._bounds[1:]):
+            conn, worker_conn = context.Pipe()
+            process = context.Process(
+                target=_work,
+                args=(
+                    worker_conn, seeds[start:end], max_episode_steps, kwargs,
+                ),
+                daemon=True,
+            )
+            process.start()
+            worker_conn.close()
+            self._conns.append(conn)
+            self._processes.append(process)
+
+    def step(self, actions: np.ndarray) -> tuple:
+        """Perform one action in every environment.
+
+        Args:
+            actions (np.ndarray): The action of each environment, of shape
+                (N,).
+
+        Returns:
+            ndarray | dict: The next states, stacked.
+            ndarray: The rewards, of shape (N,).
+            ndarray: The done flags, of shape (N,).
+            dict: Additional information. 'truncated' flags the members cut
+                short by max_episode_steps, and 'terminal_observation'
+                holds the last observation of the members that were reset,
+                if any.
+
+        Raises:
+            ValueError: If the number or value of the actions is wrong.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if actions.shape != (self.n_envs,):
+            raise ValueError('Expected {} actions'.format(self.n_envs))
+        if np.any((actions < 0) | (actions > 3)):
+            raise ValueError('Invalid action {}'.format(actions))
+        bounds = zip(self._bounds[:-1], self._bounds[1:])
+        for conn, (start, end) in zip(self._conns, bounds):
+            conn.send(('step', actions[start:end]))
+        results = _receive(self._conns)
+        self.steps += self.n_envs
+
+        states, rewards, dones, truncated, terminal = zip(*results)
+        info = {'truncated': np.concatenate(truncated)}
+        terminal = [state for states_ in terminal for state in states_]
+        if terminal:
+            info['terminal_observation'] = _stack(terminal)
+        return (
+            _concatenate(states),
+            np.concatenate(rewards),
+            np.concatenate(dones),
+            info,
+        )
+
+    def reset(self) -> np.ndarray | dict:
+        """Reset every environment.
+
+        Returns:
+            ndarray | dict: The states, stacked.
+        """
+        for conn in self._conns:
+            conn.send(('reset', None))
+        return _concatenate(_receive(self._conns))
+
+    def close(self):
+        """Stop the workers."""
+        for conn in self._conns:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, EOFError):
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join()
+        self._conns = []
+        self._processes = []
+
+
+def _work(conn, seeds: list, max_episode_steps: int | None, kwargs: dict):
+    """Serve the commands of the pool for a slice of its environments.
+
+    Args:
+        conn: The worker end of the pipe.
+        seeds (list): The seed of each environment.
+        max_episode_steps (int | None): The step limit of the episodes.
+        kwargs (dict): The other arguments of each Environment.
+    """
+    envs = [Environment(seed=seed, **kwargs) for seed in seeds]
+    steps = np.zeros(len(envs), dtype=np.int64)
+    try:
+        while True:
+            command, data = conn.recv()
+            if command == 'close':
+                break
+            try:
+                if command == 'reset':
+                    steps[:] = 0
+                    result = _stack([env.reset() for env in envs])
+                else:
+                    result = _step(envs, steps, data, max_episode_steps)
+            except Exception as error:
+                conn.send((None, error))
+            else:
+                conn.send((result, None))
+    finally:
+        for env in envs:
+            env.close()
+        conn.close()
+
+
+def _step(
+    envs: list,
+    steps: np.ndarray,
+    actions: np.ndarray,
+    max_episode_steps: int | None,
+) -> tuple:
+    """Step the environments of a worker and reset those that finished.
+
+    Args:
+        envs (list): The environments.
+        steps (np.ndarray): The number of steps of each current episode.
+        actions (np.ndarray): The action of each environment.
+        max_episode_steps (int | None): The step limit of the episodes.
+
+    Returns:
+        tuple: The stacked states, the rewards, done and truncated flags,
+            and the last states of the finished episodes.
+    """
+    states, rewards, dones, truncated, terminal = [], [], [], [], []
+    steps += 1
+    for idx, (env, action) in enumerate(zip(envs, actions.tolist())):
+        state, reward, done, _ = env.step(action)
+        cut = (
+            not done
+            and max_episode_steps is not None
+            and steps[idx] >= max_episode_steps
+        )
+        if done or cut:
+            terminal.append(_copy(state))
+            state = env.reset()
+            steps[idx] = 0
+        states.append(state)
+        rewards.append(reward)
+        dones.append(done)
+        truncated.append(cut)
+    return (
+        _stack(states),
+        np.array(rewards, dtype=np.float32),
+        np.array(dones, dtype=bool),
+        np.array(truncated, dtype=bool),
+        terminal,
+    )
+
+
+def _receive(conns: list) -> list:
+    """Return the results of the workers, raising an error if one failed.
+
+    The reply of every worker is read before raising, so no reply is left
+    in a pipe to be mistaken for the result of the next command.
+
+    Args:
+        conns (list): The pool ends of the pipes.
+
+    Returns:
+        list: The result of each worker.
+
+    Raises:
+        Exception: The first exception raised in a worker.
+    """
+    replies = [conn.recv() for conn in conns]
+    for _, error in replies:
+        if error is not None:
+            raise error
+    return [result for result, _ in replies]
+
+
+def _batched_space(space: gym.Space, n_envs: int) -> gym.Space:
+    """Return the space of the stacked observations of many environments.
+
+    Args:
+        space (gym.Space): The observation space of one environment.
+        n_envs (int): The number of environments.
+
+    Returns:
+        gym.Space: The stacked space.
+    """
+    if isinstance(space, gym.spaces.Dict):
+        return gym.spaces.Dict({
+            key: _batched_space(subspace, n_envs)
+            for key, subspace in space.spaces.items()
+        })
+    return gym.spaces.Box(
+        low=np.min(space.low),
+        high=np.max(space.high),
+        shape=(n_envs,) + space.shape,
+        dtype=space.dtype,
+    )
+
+
+def _copy(state):
+    """Return a copy of an observation.
+
+    Args:
+        state: The array or dict of arrays.
+
+    Returns:
+        The copy.
+    """
+    if isinstance(state, dict):
+        return {key: vl.copy() for key, vl in state.items()}
+    return state.copy()
+
+
+def _stack(states: list):
+    """Stack observations along a new first axis.
+
+    Args:
+        states (list): The arrays or dicts of arrays.
+
+    Returns:
+        The stacked array or dict of arrays.
+    """
+    if isinstance(states[0], dict):
+        return {
+            key: np.stack([state[key] for state in states])
+            for key in states[0]
+        }
+    return np.stack(states)
+
+
+def _concatenate(states: list):
+    """Concatenate stacked observations along their first axis.
+
+    Args:
+        states (list): The stacked arrays or dicts of arrays.
+
+    Returns:
+        The concatenated array or dict of arrays.
+    """
+    if isinstance(states[0], dict):
+        return {
+            key: np.concatenate([state[key] for state in states])
+            for key in states[0]
+        }
+    return np.concatenate(states)